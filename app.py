@@ -1,19 +1,70 @@
-import csv
-import math
+import time
+
+STARTED = time.perf_counter() # start of the import of app.py, before tkinter and numpy, for the startup check
+
+import os
 import statistics
+import sys
 import tkinter as tk
-from tkinter import filedialog, ttk
+from tkinter import filedialog, simpledialog, ttk
+from tkinter import font as tkfont
 
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.stats import norm
+
+from data_analysis.cleaning import CLEANING_METHODS, DEFAULT_THRESHOLDS
+from data_analysis.dataset import Dataset, typed_values
+from data_analysis.external import DEFAULT_MEMORY_BUDGET, summarise_out_of_core
+from data_analysis.groups import group_stats, window_stats
+from data_analysis.ingest import LiveIngest, follow_file, read_socket
+from data_analysis.loader import read_csv_values
+from data_analysis.online import QUANTILE_MODES, RunningStats
+from data_analysis.pager import SortedPager
+from data_analysis.parsing import parse_numbers
+from data_analysis.plotting import DIRECT_PLOT_LIMIT, box_stats_from_quartiles, sorted_histogram, thin_points
+from data_analysis.profiling import profiler
+from data_analysis.report import format_cleaning, format_columns_table, format_fits, format_invalid_tokens, format_live_status, format_lookup, format_profile, format_report, format_stats_table
+from data_analysis.results import AnalysisCache
+from data_analysis.stats import summarise_sorted
+from data_analysis.store import load_table, open_binary
+from data_analysis.tables import table_writer
+from data_analysis.tasks import TaskRunner
+
+# matplotlib and scipy.stats take seconds to import, so they are not imported before the window appears.
+# load_plot_modules brings them in the first time a plot needs them, or in the background once the window is up
+STARTUP_TARGET = 1.0 # seconds from importing app.py to the first paint of the main window
+HEAVY_MODULES = ("matplotlib", "scipy") # must not be imported by the first paint
+PREWARM_DELAY = 500 # milliseconds after startup before the plot modules are loaded in the background
+
+
+def load_plot_modules():
+    global FigureCanvasTkAgg, NavigationToolbar2Tk, PLOTS, norm
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    from scipy.stats import norm
+
+    from data_analysis.figures import PLOTS
+
 
 # create app
 app = tk.Tk()
 app.title("Jinx's Data Analysis")
 
-numbers = [] # create empty numbers list
+# parsing, statistics and plot preparation run on worker threads, results come back through app.after
+analysis_tasks = TaskRunner(app.after, on_busy=lambda busy: show_busy(busy))
+view_tasks = TaskRunner(app.after)
+
+dataset = Dataset() # the values being analysed, int64 or float64 in one growing buffer
+analysed_input = "" # input box text the current results were analysed from
+running_stats = None # incremental statistics of the dataset, so appended values don't need a full re-analysis
+analysis_cache = AnalysisCache(dataset) # summary and derived arrays of the dataset, shared by the output, plots and lookups
+CHECK_BLOCK = 1 << 22 # values fed to approximate statistics between checks for cancellation
+MAX_INVALID_MARKED = 1000 # invalid tokens highlighted in the input box
+PREVIEW_VALUES = 1000 # number of loaded values shown in the input box
+report_notes = "" # notes about the input printed above the statistics, kept for reformatting
+report_columns = None # (names, summaries, selected index) of a loaded file with several columns
+loaded_table = None # (table, column summaries) of the loaded file
 data_analysed = False # global variable for functions that will only run if data has been analysed
+live_ingest = None # the LiveIngest feeding the dataset, if any
+LIVE_REFRESH = 250 # milliseconds between folding live values into the dataset and redrawing the output
 
 
 def append_to_output(text): # every time text is inserted into output window, it will enable, insert text, then disable, making output window read only
@@ -22,15 +73,33 @@ def append_to_output(text): # every time text is inserted into output window, it
     output_text.config(state=tk.DISABLED) # disable the  output widget
 
 
+# replace everything in the output window with text built beforehand, in a single widget update.
+# a table goes first, in a fixed width font so its columns line up
+def set_output(text, table=""):
+    output_text.config(state=tk.NORMAL)
+    output_text.delete(1.0, tk.END)
+    output_text.insert(tk.END, table, "table", text)
+    output_text.config(state=tk.DISABLED)
+
+
 # function for clear button
 def clear_data(): # function to clear input and output data
-    global numbers, data_analysed
+    global data_analysed, analysed_input, running_stats, report_notes, report_columns, loaded_table, live_ingest
+    analysis_tasks.cancel()
+    stop_live_ingest()
+    live_ingest = None
     data_analysed = False
-    numbers = [] # clear numbers list
+    analysed_input = ""
+    running_stats = None
+    report_notes = ""
+    report_columns = None
+    loaded_table = None
+    show_column_picker(None)
+    analysis_cache.clear()
+    dataset.clear()
     entry.delete("1.0", tk.END)
-    output_text.config(state=tk.NORMAL) # enable the output widget
-    output_text.delete(1.0, tk.END) # clear output data
-    output_text.config(state=tk.DISABLED) # disable the  output widget
+    show_preview_note("")
+    set_output("") # clear output data
 
 
 # function for save button
@@ -46,150 +115,147 @@ def save_results():
         append_to_output("Results saved successfully!\n" + "\n")
 
 
-# create plots
-def create_plot(x, y, plot_type, xlabel, ylabel, title):
-    plt.figure()
-    if plot_type == 'histogram':
-            plt.hist(y, bins=30, edgecolor='black')
-    elif plot_type == 'line':
-            plt.plot(x, y, color='blue', marker='o', linestyle='-', linewidth='2')
-    elif plot_type == 'scatter':
-            plt.scatter(x, y, color='blue', marker='o')
-    elif plot_type == 'box':
-            plt.boxplot(y, vert=False)
-            q1 = np.percentile(y, 25)
-            q3 = np.percentile(y, 75)
-            median = calculate_median(y)
-    
-            plt.annotate(f"Q1: {q1:.2f}", xy=(q1, 1.1), xytext=(q1, 1.4), arrowprops=dict(facecolor='black', arrowstyle="->"), ha='center')
-            plt.annotate(f"Median: {median:.2f}", xy=(median, 1.1), xytext=(median, 1.2), arrowprops=dict(facecolor='black', arrowstyle="->"), ha='center')
-            plt.annotate(f"Q3: {q3:.2f}", xy=(q3, 1.1), xytext=(q3, 1.3), arrowprops=dict(facecolor='black', arrowstyle="->"), ha='center')
-    else:
-        raise ValueError("Invalid Plot Type")
-
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-
-
-# functions to display plots
-def show_histogram():
-    if not data_analysed:
-        tk.messagebox.showwarning("Warning", "No data available to plot. Please enter and analyse data first!")
-        return
-    create_plot(None, numbers, 'histogram', 'Value', 'Frequency', 'Histogram of input values')
-    plt.show()
-
-
-def show_line_plot():
+# plots are drawn into one persistent figure per plot type, each on a tab of the plot window. large
+# datasets arrive already reduced by the worker: histograms as bins, long lines as per-bucket minima/maxima
+# and big scatters as a density grid, so drawing time doesn't grow with the data
+plot_window = None # created with the first plot, hidden rather than destroyed when closed
+plot_notebook = None
+plot_tabs = {} # plot name -> (figure, canvas, tab frame)
+plots_shown = {} # plot name -> (dataset version, summary, cleaning) its figure was last drawn from
+
+
+# the tab of a plot, with its figure and canvas, made the first time that plot is shown
+def plot_tab(name):
+    global plot_window, plot_notebook
+    if plot_window is None:
+        plot_window = tk.Toplevel(app)
+        plot_window.title("Plots")
+        plot_window.protocol("WM_DELETE_WINDOW", plot_window.withdraw)
+        plot_notebook = ttk.Notebook(plot_window)
+        plot_notebook.pack(fill=tk.BOTH, expand=True)
+        apply_theme_to_widget(plot_window, themes[theme_var.get()])
+
+    if name not in plot_tabs:
+        title, figure_class = PLOTS[name]
+        figure = figure_class()
+        tab = ttk.Frame(plot_notebook)
+        canvas = FigureCanvasTkAgg(figure.figure, master=tab)
+        NavigationToolbar2Tk(canvas, tab) # packs itself along the bottom, before the canvas takes the rest
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        plot_notebook.add(tab, text=title)
+        plot_tabs[name] = (figure, canvas, tab)
+    return plot_tabs[name]
+
+
+# whether a plot's tab is the one showing in an open plot window
+def plot_visible(name):
+    if name not in plot_tabs or plot_window.state() == "withdrawn":
+        return False
+    return plot_notebook.select() == str(plot_tabs[name][2])
+
+
+def show_plot_tab(name):
+    figure, canvas, tab = plot_tab(name)
+    plot_notebook.select(tab)
+    plot_window.deiconify()
+    plot_window.lift()
+
+
+# compute what a plot needs on the worker thread, reusing anything already in the analysis cache, then move
+# the plot's existing artists to it on the gui thread. a plot already showing the current results is just
+# brought forward. both halves are timed under the plot's name when profiling
+def plot_in_background(name, prepare):
     if not data_analysed:
         tk.messagebox.showwarning("Warning", "No data available to plot. Please enter and analyse data first!")
         return
-    
-    q1 = np.percentile(numbers, 25)
-    q3 = np.percentile(numbers, 75)
-    median = calculate_median(numbers)
-    
-    create_plot(list(range(len(numbers))), numbers, 'line', 'Index', 'Value', 'Line plot of input values')
-    
-    # add vertical lines and text for quartiles and median
-    plt.axvline(x=len(numbers) * 0.25, color='r', linestyle='--', label='Q1')
-    plt.text(len(numbers) * 0.25, max(numbers), f'Q1: {q1}', color='red', ha='center', va='bottom')
-    plt.axvline(x=len(numbers) * 0.75, color='g', linestyle='--', label='Q3')
-    plt.text(len(numbers) * 0.75, max(numbers), f'Q3: {q3}', color='green', ha='center', va='bottom')
-    plt.axvline(x=len(numbers) * 0.5, color='orange', linestyle='--', label='Median')
-    plt.text(len(numbers) * 0.5, max(numbers), f'Median: {median}', color='orange', ha='center', va='bottom')
-
-    plt.legend()
-    plt.show()
-
-
-def show_scatter_plot():
-    if not data_analysed:
-        tk.messagebox.showwarning("Warning", "No data available to plot. Please enter and analyse data first!")
+    shown = (analysis_cache.version, analysis_cache.summary, current_cleaning)
+    if name in plots_shown and plots_shown[name][0::2] == shown[0::2] and plots_shown[name][1] is shown[1]:
+        show_plot_tab(name)
         return
-    create_plot(range(len(numbers)), numbers, 'scatter', 'Index', 'Value', 'Scatter plot of unsorted input values')
-    plt.show()
 
+    def prepare_plot(state):
+        load_plot_modules()
+        state.check()
+        return prepare(analysis_cache)
 
-def show_box_plot():
-    if not data_analysed:
-        tk.messagebox.showwarning("Warning", "No data available to plot. Please enter and analyse data first!")
-        return
-    create_plot(None, numbers, 'box', None, None, 'Box plot of input values')
-    plt.show()
+    def draw(prepared):
+        figure, canvas, tab = plot_tab(name)
+        figure.update(prepared)
+        plots_shown[name] = shown
+        canvas.draw_idle()
+        show_plot_tab(name)
 
+    view_tasks.submit(profiler.wrap(name + ": prepare", prepare_plot),
+                      on_done=profiler.wrap(name + ": draw", draw), on_error=show_task_error)
 
-# create bell curve
-def show_bell_curve():
-    if not data_analysed:
-        tk.messagebox.showwarning("Warning", "No data available to plot. Please enter and analyse data first!")
-        return
 
-    mean = calculate_mean(numbers)
-    std = calculate_standard_deviation(numbers)
+# functions to display plots
+def show_histogram():
+    cleaning = current_cleaning
 
-    plt.hist(numbers, bins=30, density=True, alpha=0.5, color='g', edgecolor='black')
+    # values removed by outlier cleaning are counted per bin from the kept slice of the sorted values
+    def prepare(cache):
+        counts, edges = cache.histogram(30)
+        if cleaning is None:
+            return counts, edges, None
+        cleaned = cache.cleaned(*cleaning)
+        return counts, edges, counts - sorted_histogram(cache.sorted_values()[cleaned.start:cleaned.end], edges)
 
-    x = np.linspace(min(numbers), max(numbers), 100)
-    y = norm.pdf(x, mean, std)
-    plt.plot(x, y, color='blue')
+    plot_in_background("histogram", prepare)
 
-    for i in range(-3, 4):
-        plt.axvline(mean + i * std, alpha=0.6, color='red', linestyle='--')
 
-        if i != 0:
-            plt.text(mean + i * std, max(y)/10, f'Z={i}', color='red', ha='center', va='bottom')
+def show_line_plot():
+    def prepare(cache):
+        summary = cache.summary
+        if summary.count <= DIRECT_PLOT_LIMIT:
+            plot_type, (x, y) = 'line', (np.arange(summary.count), cache.values)
+        else:
+            plot_type, (x, y) = 'decimated_line', cache.decimated_line()
+        return plot_type, x, y, summary.count, summary.maximum, summary.q1, summary.median, summary.q3
 
-    plt.title('Bell Curve (Normal Distribution)')
-    plt.xlabel('Value')
-    plt.ylabel('Density')
-    plt.show()
+    plot_in_background("line plot", prepare)
 
 
-# calculate mean of list
-def calculate_mean(numbers):
-    total = sum(numbers)
-    count = len(numbers)
-    mean = total / count
-    return mean
+def show_scatter_plot():
+    def prepare(cache):
+        if len(cache.values) <= DIRECT_PLOT_LIMIT:
+            return 'scatter', cache.values
+        return 'density', cache.density_grid()
 
+    plot_in_background("scatter plot", prepare)
 
-# calculate median of list
-def calculate_median(numbers):
-    sorted_numbers = sorted(numbers)
-    length = len(sorted_numbers)
 
-    if length % 2 == 1:
-        median = sorted_numbers[length // 2]
-    else:
-        middle_right = length // 2
-        middle_left = middle_right - 1
-        median = (sorted_numbers[middle_left] + sorted_numbers[middle_right]) / 2
-    return median
+def show_box_plot():
+    # quartiles from the analysis are reused instead of sorting the values again
+    def box_stats(values, summary):
+        box_stats = box_stats_from_quartiles(values, summary.q1, summary.median, summary.q3, summary.quantile_error)
+        box_stats[0]['fliers'] = thin_points(box_stats[0]['fliers'])
+        return box_stats
 
+    cleaning = current_cleaning
 
-# calculate range of list
-def calculate_range(numbers):
-    list_range = max(numbers) - min(numbers)
-    return list_range
+    def prepare(cache):
+        if cleaning is None:
+            return cache.get('box_stats', box_stats, from_summary=True), None
+        return cache.get('box_stats', box_stats, from_summary=True), thin_points(cache.values[~cache.kept_mask(*cleaning)])
 
+    plot_in_background("box plot", prepare)
 
-# calculate standard deviation of list
-def calculate_standard_deviation(numbers):
-    mean = calculate_mean(numbers)
-    squared_diff_sum = sum((x - mean) ** 2 for x in numbers)
-    variance = squared_diff_sum / len(numbers)
-    standard_deviation = math.sqrt(variance)
-    return standard_deviation
 
+# create bell curve, with the best fitting distribution drawn over it
+def show_bell_curve():
+    def prepare(cache):
+        summary = cache.summary
+        density, edges = cache.histogram(30, density=True)
+        x = np.linspace(summary.minimum, summary.maximum, 100)
+        fits = cache.fitted_distributions() # fitting can take seconds, it is left to the fit distributions action
+        best_fit = None
+        if fits:
+            fit_y = fits[0].distribution.pdf(x)
+            best_fit = fits[0].name, fits[0].ks, np.where(np.isfinite(fit_y), fit_y, np.nan) # gamma's density is infinite at 0 for shapes below 1
+        return summary.mean, summary.std, density, edges, x, norm.pdf(x, summary.mean, summary.std), best_fit
 
-# calculate z scores
-def calculate_z_scores():
-    mean = calculate_mean(numbers)
-    std = calculate_standard_deviation(numbers)
-    z_scores = [(x - mean) / std for x in numbers]
-    return z_scores
+    plot_in_background("bell curve", prepare)
 
 
 # function for finding z score of specific value
@@ -204,46 +270,235 @@ def find_z_score():
         tk.messagebox.showwarning("Warning", "Please enter a value to find its Z-score!")
         return
 
-    try:
-        value_to_find = float(value_to_find_str)
-    except ValueError:
+    # several values separated by spaces or commas are looked up together
+    values_to_find, invalid_tokens = parse_numbers(value_to_find_str)
+    if invalid_tokens:
         tk.messagebox.showwarning("Warning", "Invalid input! Please enter a numerical value to find its Z-score.")
         return
-    
-    mean = calculate_mean(numbers)
-    std = calculate_standard_deviation(numbers)
-    z_score = (value_to_find - mean) / std
 
-    if value_to_find in numbers:
-        append_to_output("Z-score of {}: {:.2f}\n".format(value_to_find, z_score) + "\n")
+    lookup_in_background(lambda state: values_to_find)
+
+
+# find the z-scores of every value in a csv file, e.g. a list of thresholds to check against the dataset
+def find_z_scores_from_csv():
+    if not data_analysed:
+        tk.messagebox.showwarning("Warning", "No data available. Please enter and analyse data first!")
+        return
+
+    file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+    if file_path:
+        lookup_in_background(lambda state: read_csv_values(file_path, progress=state.report))
+
+
+# look query values up in the sorted-array index of the dataset on the worker thread, the index is
+# built on the first lookup and kept until the data changes, every later batch is a couple of binary searches
+def lookup_in_background(read_queries):
+    def lookup(state):
+        queries = read_queries(state)
+        state.check()
+        return format_lookup(analysis_cache.value_index().lookup(queries), selected_decimal_places)
+
+    view_tasks.submit(lookup, on_done=append_to_output, on_error=show_task_error)
+
+
+# worker job for loading a csv file, every column is summarised straight away.
+# a binary copy saved by an earlier load is memory-mapped instead, together with its cached summaries
+def load_values(file_path, decimal_places, state):
+    if file_path.lower().endswith(".npy"):
+        with profiler.span("load csv: open binary"):
+            table, summaries = open_binary(file_path)
+        from_store = True
     else:
-        append_to_output("Z-score of {}: {:.2f}".format(value_to_find, z_score) + "\n" + "Note: The value {} was not found in your dataset and may not be applicable.\n".format(value_to_find) + "\n")
+        with profiler.span("load csv: read and summarise"):
+            table, summaries, from_store = load_table(file_path, progress=state.report)
+    state.check()
+    if not any(summaries):
+        return None, None, None, None
+
+    # start with the first column that has numbers in it
+    index = next(index for index, summary in enumerate(summaries) if summary)
+    notes = "Loaded the saved binary copy of this file and its cached summary.\n" if from_store else ""
+    return (table, summaries), *select_column(table, summaries, index, decimal_places, notes)
+
+
+# worker job for switching to another column of a loaded file. the input box preview and the report
+# are formatted here too, leaving the gui thread only widget updates
+def select_column(table, summaries, index, decimal_places, notes=""):
+    values = table.values(index)
+
+    # only show the start of the column in the input box, the loaded values are analysed directly.
+    # the note saying so goes under the input box, where editing the preview can't make it part of the input
+    with profiler.span("load csv: preview"):
+        preview = " ".join(f"{number:.15g}" for number in values[:PREVIEW_VALUES])
+        preview_note = "Showing the first {} of {} values loaded from file".format(PREVIEW_VALUES, len(values)) if len(values) > PREVIEW_VALUES else ""
+    columns = (table.names, summaries, index) if len(table.columns) > 1 else None
+    return preview, preview_note, build_report((values, [], summaries[index], None), preview, decimal_places, notes, columns)
 
 
 # importing csv files
 def load_csv():
-    global numbers
+    file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Binary Datasets", "*.npy")])
+    if not file_path:
+        return
+
+    clear_data()
+
+    # track bytes read while the file is parsed in chunks
+    def show_progress(bytes_read, total_bytes):
+        progress_bar.config(maximum=max(total_bytes, 1), value=bytes_read)
+
+    progress_bar.grid()
+    analysis_tasks.submit(load_values, file_path, selected_decimal_places, on_done=show_loaded_csv, on_error=show_task_error, on_progress=show_progress)
+
+
+def show_loaded_csv(result):
+    global loaded_table
+    loaded_table, preview, preview_note, analysis = result
+    if analysis is None:
+        tk.messagebox.showwarning("Warning", "No numerical data found in the selected file.")
+        return
+
+    show_loaded_column((preview, preview_note, analysis))
+
+
+def show_loaded_column(result):
+    preview, preview_note, analysis = result
+    with profiler.span("load csv: render preview"):
+        entry.delete("1.0", tk.END)
+        entry.insert(tk.END, preview)
+    show_analysis(analysis, entry.get("1.0", tk.END).rstrip())
+    show_preview_note(preview_note)
+
+
+# note under the input box of how much of a loaded file it shows, hidden when empty
+def show_preview_note(note):
+    preview_label.config(text=note)
+    if note:
+        preview_label.grid()
+    else:
+        preview_label.grid_remove()
+
+
+# live ingest: a reader thread parses values from a growing file or a socket into a bounded queue, and every
+# LIVE_REFRESH ms the gui folds whatever has queued up into the dataset and the running statistics in one batch
+def start_live_ingest(name, source):
+    global live_ingest, running_stats
+    clear_data()
+    quantile_error = current_quantile_error if current_quantile_mode == "approx" else None
+    running_stats = RunningStats() if quantile_error is None else RunningStats.for_error(quantile_error)
+    live_ingest = LiveIngest(name, source)
+    live_ingest.start()
+    set_output(format_live_status(live_ingest))
+    app.after(LIVE_REFRESH, refresh_live, live_ingest)
+
+
+# the output keeps refreshing until the values already queued have been added
+def stop_live_ingest():
+    if live_ingest is not None:
+        live_ingest.stop()
+
+
+def refresh_live(ingest):
+    global data_analysed, analysed_input, report_notes
+    if ingest is not live_ingest:
+        return # cleared, or replaced by another source
+    values = ingest.drain()
+    if len(values):
+        with profiler.span("live: update statistics"):
+            dataset.extend(values)
+            running_stats.update(values)
+            summary = running_stats.summary()
+        data_analysed = True
+        analysed_input = entry.get("1.0", tk.END).rstrip()
+        analysis_cache.update(summary, running_stats.sorted_values)
+
+    # the histogram follows the values, but a redraw never cancels a view job in flight (a lookup, group
+    # statistics, an export or its own last redraw): the refresh after that job finishes catches it up
+    if plot_visible("histogram") and not view_tasks.busy and plots_shown.get("histogram", (None,))[0] != analysis_cache.version:
+        show_histogram()
+
+    # the counters are refreshed even when nothing arrived, so a stalled source shows up
+    report_notes = format_live_status(ingest)
+    set_output(report_notes + (format_report(analysis_cache.summary, selected_decimal_places) if data_analysed else ""))
+    if ingest.running or ingest.backlog:
+        app.after(LIVE_REFRESH, refresh_live, ingest)
+
+
+def follow_file_live():
+    file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Log Files", "*.log *.txt"), ("All Files", "*")])
+    if file_path:
+        start_live_ingest(file_path, lambda stopped: follow_file(file_path, stopped))
+
+
+def listen_socket_live():
+    address = simpledialog.askstring("Listen on Socket", "Address of the numbers to receive\n(tcp://host:port connects, udp://host:port listens):",
+                                     initialvalue="udp://127.0.0.1:9000", parent=app)
+    if address:
+        start_live_ingest(address, lambda stopped: read_socket(address, stopped))
+
+
+# worker job for a csv file too large to load: it is streamed within the memory budget (bytes), spilling
+# to a temporary directory, and only the report comes back
+def analyse_out_of_core(file_path, memory_budget, quantile_error, decimal_places, state):
+    with profiler.span("load csv: out of core"):
+        summary = summarise_out_of_core(file_path, memory_budget, quantile_error, progress=state.report)
+    notes = "Analysed out of core within a {} MB memory budget, the values were not loaded.\n" \
+            "Use Load CSV for plots, z-scores and sorted values.\n".format(memory_budget // 2 ** 20)
+    return notes + format_report(summary, decimal_places)
+
+
+# analysing csv files larger than memory, with the budget from the statistics settings
+def analyse_large_csv():
     file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
     if not file_path:
         return
-    
-    output_text.config(state=tk.NORMAL)
-    output_text.delete(1.0, tk.END)
-    output_text.config(state=tk.DISABLED)
 
-    entry.delete("1.0", tk.END)
-    numbers = []
+    clear_data()
+
+    def show_progress(bytes_read, total_bytes):
+        progress_bar.config(maximum=max(total_bytes, 1), value=bytes_read)
+
+    quantile_error = current_quantile_error if current_quantile_mode == "approx" else None
+    progress_bar.grid()
+    analysis_tasks.submit(analyse_out_of_core, file_path, current_memory_budget * 2 ** 20, quantile_error, selected_decimal_places,
+                          on_done=set_output, on_error=show_task_error, on_progress=show_progress)
 
-    with open(file_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            for item in row:
-                try:
-                    number = int(item)
-                    numbers.append(number)
-                    entry.insert(tk.END, str(number) + " ")
-                except ValueError:
-                    continue
+
+# when a column is picked, analyse and plot that column of the loaded file instead
+def pick_column(event=None):
+    table, summaries = loaded_table
+    index = column_picker.current()
+    if summaries[index] is None:
+        tk.messagebox.showwarning("Warning", "The column {} has no numerical data.".format(table.names[index]))
+        column_picker.set(table.names[report_columns[2]])
+        return
+    decimal_places = selected_decimal_places
+    analysis_tasks.submit(lambda state: select_column(table, summaries, index, decimal_places), on_done=show_loaded_column, on_error=show_task_error)
+
+
+# the column picker is only shown while the results come from a file with several columns
+def show_column_picker(columns):
+    if columns is None:
+        column_label.grid_remove()
+        column_picker.grid_remove()
+        return
+    names, summaries, index = columns
+    column_picker.config(values=names)
+    column_picker.set(names[index])
+    column_label.grid()
+    column_picker.grid()
+
+
+# show the analyse button as busy while analysis runs on the worker thread
+def show_busy(busy):
+    button_analyse.config(text="Analysing... (Esc to cancel)" if busy else "Analyse")
+    app.config(cursor="watch" if busy else "")
+    if not busy:
+        progress_bar.grid_remove()
+
+
+def show_task_error(error):
+    tk.messagebox.showerror("Error", str(error))
 
 
 # global application theme
@@ -385,36 +640,43 @@ current_theme = 'light'
 apply_appearance(current_theme)
 selected_decimal_places = 0  # default value
 current_font_size = 12 # default font size
-
-
-def format_number(number, decimal_places):
-    return f"{number:.{decimal_places}f}"
+current_quantile_mode = 'exact' # exact quantiles, or an approximate sketch for very large inputs
+current_quantile_error = 0.01 # normalised rank error of the approximate quantiles
+current_memory_budget = DEFAULT_MEMORY_BUDGET // 2 ** 20 # megabytes an out-of-core analysis may use
+current_cleaning = None # (method, threshold) of the outlier cleaning applied to the report and plots, None when off
 
 
 # when apply button is pressed
-def apply_settings(size, decimal_places, theme):
-    global selected_decimal_places, current_font_size, current_theme
+def apply_settings(size, decimal_places, theme, quantile_mode, quantile_error_percent, memory_budget, cleaning_method, cleaning_threshold):
+    global selected_decimal_places, current_font_size, current_theme, current_quantile_mode, current_quantile_error, current_memory_budget, current_cleaning
     selected_decimal_places = decimal_places
     current_theme = theme
     current_font_size = size
+    quantiles_changed = (quantile_mode, quantile_error_percent / 100) != (current_quantile_mode, current_quantile_error)
+    current_quantile_mode = quantile_mode
+    current_quantile_error = quantile_error_percent / 100
+    current_memory_budget = memory_budget
+    current_cleaning = None if cleaning_method == "off" else (cleaning_method, cleaning_threshold)
     
     font_tuple = ("TkDefaultFont", size)
     entry.configure(font=font_tuple)
     output_text.configure(font=font_tuple)
+    output_text.tag_configure("table", font=("TkFixedFont", size))
 
-    output_text.config(state=tk.NORMAL)
-    output_text.delete(1.0, tk.END)
-    output_text.config(state=tk.DISABLED)
-
-    if data_analysed == True:
+    # only a change of quantile mode (or an analysis still running) needs the statistics again,
+    # anything else (cleaning included) just reformats the last results. any other job (loading a file,
+    # fitting distributions) is left to finish, it prints its own output
+    if data_analysed == True and (quantiles_changed or analysis_tasks.kind == "analysis"):
       get_input()
+    elif data_analysed == True and analysis_tasks.kind in (None, "report"):
+      show_report()
 
     apply_appearance(theme)
 
 
 # when ok button is pressed
-def apply_and_close_settings(window, size, decimal_places, theme):
-    apply_settings(size, decimal_places, theme)
+def apply_and_close_settings(window, size, decimal_places, theme, quantile_mode, quantile_error_percent, memory_budget, cleaning_method, cleaning_threshold):
+    apply_settings(size, decimal_places, theme, quantile_mode, quantile_error_percent, memory_budget, cleaning_method, cleaning_threshold)
     window.destroy()
 
 
@@ -427,7 +689,7 @@ def settings():
     
     settings_window = tk.Toplevel(app)
     settings_window.title("Settings")
-    settings_window.geometry('250x300')
+    settings_window.geometry('380x300')
     
     # apply theme
     apply_theme_to_widget(settings_window, theme_dict)
@@ -475,14 +737,96 @@ def settings():
     
     notebook.add(appearance_frame, text="Appearance Settings")
 
+    # statistics settings tab
+    statistics_frame = ttk.Frame(notebook)
+
+    # exact keeps a sorted copy of the values, approximate a small quantile sketch
+    label = ttk.Label(statistics_frame, text="Quantiles:")
+    label.pack(anchor=tk.W, padx=10, pady=5)
+
+    quantile_mode_var = tk.StringVar(value=current_quantile_mode)
+    quantile_dropdown = ttk.OptionMenu(statistics_frame, quantile_mode_var, current_quantile_mode, *QUANTILE_MODES)
+    quantile_dropdown.pack(anchor=tk.W, padx=10)
+
+    # bounds the approximate median, quartiles and box plot, smaller errors keep a larger sketch
+    label = ttk.Label(statistics_frame, text="Approximate rank error (%):")
+    label.pack(anchor=tk.W, padx=10, pady=5)
+    quantile_error_var = tk.DoubleVar(value=current_quantile_error * 100)
+    quantile_error_spinbox = ttk.Spinbox(statistics_frame, from_=0.1, to=5, increment=0.1, textvariable=quantile_error_var, state='readonly')
+    quantile_error_spinbox.pack(anchor=tk.W, padx=10)
+
+    # memory an out-of-core analysis of a large csv file keeps to, the rest is spilled to disk
+    label = ttk.Label(statistics_frame, text="Out-of-core memory budget (MB):")
+    label.pack(anchor=tk.W, padx=10, pady=5)
+    memory_budget_var = tk.IntVar(value=current_memory_budget)
+    memory_budget_spinbox = ttk.Spinbox(statistics_frame, from_=16, to=16384, increment=16, textvariable=memory_budget_var, state='readonly')
+    memory_budget_spinbox.pack(anchor=tk.W, padx=10)
+
+    # outliers left out of the report and highlighted on the histogram and box plot
+    label = ttk.Label(statistics_frame, text="Outlier cleaning:")
+    label.pack(anchor=tk.W, padx=10, pady=5)
+    cleaning_method = current_cleaning[0] if current_cleaning else "off"
+    cleaning_method_var = tk.StringVar(value=cleaning_method)
+    cleaning_threshold_var = tk.DoubleVar(value=current_cleaning[1] if current_cleaning else DEFAULT_THRESHOLDS["z-score"])
+    cleaning_dropdown = ttk.OptionMenu(statistics_frame, cleaning_method_var, cleaning_method, "off", *CLEANING_METHODS,
+                                       command=lambda method: cleaning_threshold_var.set(DEFAULT_THRESHOLDS.get(method, cleaning_threshold_var.get())))
+    cleaning_dropdown.pack(anchor=tk.W, padx=10)
+    cleaning_threshold_spinbox = ttk.Spinbox(statistics_frame, from_=0.5, to=10, increment=0.5, textvariable=cleaning_threshold_var, state='readonly')
+    cleaning_threshold_spinbox.pack(anchor=tk.W, padx=10, pady=2)
+
+    notebook.add(statistics_frame, text="Statistics Settings")
+
+    # diagnostics tab: stage timings recorded while profiling is on, switched on here or by DATA_ANALYSIS_PROFILE
+    diagnostics_frame = ttk.Frame(notebook)
+
+    profile_var = tk.BooleanVar(value=profiler.enabled)
+    profile_check = ttk.Checkbutton(diagnostics_frame, text="Record stage timings", variable=profile_var,
+                                    command=lambda: setattr(profiler, "enabled", profile_var.get()))
+    profile_check.pack(anchor=tk.W, padx=10, pady=2)
+    memory_var = tk.BooleanVar(value=profiler.memory)
+    memory_check = ttk.Checkbutton(diagnostics_frame, text="Trace peak memory (slower)", variable=memory_var,
+                                   command=lambda: setattr(profiler, "memory", memory_var.get()))
+    memory_check.pack(anchor=tk.W, padx=10, pady=2)
+
+    profile_text = tk.Text(diagnostics_frame, wrap=tk.NONE, height=6, width=45, font=("TkFixedFont", 9))
+    profile_text.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    def refresh_profile():
+        profile_text.config(state=tk.NORMAL)
+        profile_text.delete("1.0", tk.END)
+        profile_text.insert(tk.END, format_profile(profiler.summary()))
+        profile_text.config(state=tk.DISABLED)
+
+    def clear_profile():
+        profiler.clear()
+        refresh_profile()
+
+    def export_profile(write, extension, description):
+        file_path = filedialog.asksaveasfilename(parent=settings_window, defaultextension=extension, filetypes=[(description, "*" + extension)])
+        if file_path:
+            try:
+                write(file_path)
+            except OSError as error:
+                show_task_error(error)
+
+    profile_buttons = ttk.Frame(diagnostics_frame)
+    profile_buttons.pack(anchor=tk.W, padx=10, pady=2)
+    ttk.Button(profile_buttons, text="Refresh", command=refresh_profile).pack(side=tk.LEFT)
+    ttk.Button(profile_buttons, text="Clear", command=clear_profile).pack(side=tk.LEFT)
+    ttk.Button(profile_buttons, text="JSON", command=lambda: export_profile(profiler.write_json, ".json", "JSON Files")).pack(side=tk.LEFT)
+    ttk.Button(profile_buttons, text="Chrome Trace", command=lambda: export_profile(profiler.write_chrome_trace, ".json", "Chrome Trace Files")).pack(side=tk.LEFT)
+    refresh_profile()
+
+    notebook.add(diagnostics_frame, text="Diagnostics")
+
     # buttons at the bottom
     button_frame = ttk.Frame(settings_window)
     button_frame.pack(pady=10, fill=tk.X)
 
-    ok_button = ttk.Button(button_frame, text="OK", command=lambda: apply_and_close_settings(settings_window, font_size_var.get(), decimal_places_var.get(), theme_var.get()))
+    ok_button = ttk.Button(button_frame, text="OK", command=lambda: apply_and_close_settings(settings_window, font_size_var.get(), decimal_places_var.get(), theme_var.get(), quantile_mode_var.get(), quantile_error_var.get(), memory_budget_var.get(), cleaning_method_var.get(), cleaning_threshold_var.get()))
     ok_button.pack(side=tk.LEFT, padx=5)
 
-    apply_button = ttk.Button(button_frame, text="Apply", command=lambda: apply_settings(font_size_var.get(), decimal_places_var.get(), theme_var.get()))
+    apply_button = ttk.Button(button_frame, text="Apply", command=lambda: apply_settings(font_size_var.get(), decimal_places_var.get(), theme_var.get(), quantile_mode_var.get(), quantile_error_var.get(), memory_budget_var.get(), cleaning_method_var.get(), cleaning_threshold_var.get()))
     apply_button.pack(side=tk.LEFT, padx=5)
 
     cancel_button = ttk.Button(button_frame, text="Cancel", command=settings_window.destroy)
@@ -505,131 +849,399 @@ def open_appearance_settings():
     appearance_frame.pack(fill=tk.BOTH, expand=True, side=tk.RIGHT)
 
 
-# function to show sorted values in separate window
+# function to show sorted values in separate window, the sort happens on the worker thread
+# unless the analysis already kept a sorted copy
 def show_sorted_values():
-    global data_analysed, apply_appearance, current_font_size
-
     if not data_analysed:
         tk.messagebox.showwarning("Warning", "No data available. Please enter and analyse data first!")
         return
 
+    view_tasks.submit(lambda state: analysis_cache.sorted_values(), on_done=open_sorted_window, on_error=show_task_error)
+
+
+# the window only ever holds the rows that fit in it: scrolling moves a pager over the sorted array
+# and formats the new page, so millions of values open and scroll as fast as a few
+def open_sorted_window(sorted_values):
+    pager = SortedPager(sorted_values)
+    marked_row = [None] # row found by the last jump, highlighted while it is on screen
+
     sorted_window = tk.Toplevel()
     sorted_window.title("Sorted Values")
     sorted_window.columnconfigure(0, weight=1)
-    sorted_window.rowconfigure(0, weight=1)
+    sorted_window.rowconfigure(1, weight=1)
 
-    sorted_text = tk.Text(sorted_window, wrap=tk.WORD, height=20, width=50)
-    sorted_text_scrollbar = ttk.Scrollbar(sorted_window, orient="vertical", command=sorted_text.yview)
-    sorted_text.config(yscrollcommand=sorted_text_scrollbar.set)
+    sorted_label = tk.Label(sorted_window, text="Sorted Values ({} values):".format(len(pager)))
+    sorted_text = tk.Text(sorted_window, wrap=tk.NONE, height=pager.rows, width=50)
     sorted_text.configure(font=(default_font, current_font_size))
 
-    sorted_text.grid(row=0, column=0, sticky='nsew')
-    sorted_text_scrollbar.grid(row=0, column=1, sticky='ns')
+    def redraw():
+        sorted_text.config(state=tk.NORMAL)
+        sorted_text.delete("1.0", tk.END)
+        sorted_text.insert(tk.END, "\n".join(pager.page(selected_decimal_places)))
+        if marked_row[0] is not None and pager.top <= marked_row[0] < pager.top + pager.rows:
+            line = marked_row[0] - pager.top + 1
+            sorted_text.tag_add("marked", "{}.0".format(line), "{}.end".format(line))
+        sorted_text.config(state=tk.DISABLED)
+        sorted_text_scrollbar.set(*pager.fractions())
+
+    # scrollbar commands: ("moveto", fraction) or ("scroll", count, "units"/"pages")
+    def scroll(action, amount, unit=None):
+        if action == "moveto":
+            pager.scroll_to(float(amount) * len(pager))
+        elif unit == "pages":
+            pager.scroll_by(int(amount) * pager.rows)
+        else:
+            pager.scroll_by(int(amount))
+        redraw()
 
-    sorted_values_str = ' '.join(format_number(number, selected_decimal_places) for number in sorted(numbers))
+    def scroll_wheel(event):
+        if event.num == 4 or event.delta > 0:
+            pager.scroll_by(-3)
+        else:
+            pager.scroll_by(3)
+        redraw()
+        return "break"
+
+    # fit the page to the window whenever it is resized
+    def resize(event):
+        line_height = tkfont.Font(font=sorted_text.cget("font")).metrics("linespace")
+        rows = max(1, (sorted_text.winfo_height() - 8) // line_height)
+        if rows != pager.rows:
+            pager.rows = rows
+            pager.scroll_to(pager.top)
+            redraw()
+
+    # binary search for a value or percentile and show it at the top of the window
+    def jump(find_index):
+        try:
+            target = float(jump_entry.get())
+        except ValueError:
+            tk.messagebox.showwarning("Warning", "Invalid input! Please enter a numerical value.", parent=sorted_window)
+            return
+        marked_row[0] = min(find_index(target), len(pager) - 1)
+        pager.scroll_to(marked_row[0])
+        redraw()
+
+    sorted_text_scrollbar = ttk.Scrollbar(sorted_window, orient="vertical", command=scroll)
+
+    jump_frame = tk.Frame(sorted_window)
+    jump_entry = tk.Entry(jump_frame)
+    jump_value_button = ttk.Button(jump_frame, text="Go to Value", command=lambda: jump(pager.index_of_value))
+    jump_percentile_button = ttk.Button(jump_frame, text="Go to Percentile", command=lambda: jump(pager.index_of_percentile))
+
+    sorted_label.grid(row=0, column=0, columnspan=2, sticky='w')
+    sorted_text.grid(row=1, column=0, sticky='nsew')
+    sorted_text_scrollbar.grid(row=1, column=1, sticky='ns')
+    jump_frame.grid(row=2, column=0, columnspan=2, pady=5)
+    jump_entry.grid(row=0, column=0, padx=5)
+    jump_value_button.grid(row=0, column=1, padx=5)
+    jump_percentile_button.grid(row=0, column=2, padx=5)
+
+    sorted_text.bind("<Configure>", resize)
+    for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+        sorted_text.bind(sequence, scroll_wheel)
+    for key, amount, unit in (("<Up>", -1, "units"), ("<Down>", 1, "units"), ("<Prior>", -1, "pages"), ("<Next>", 1, "pages")):
+        sorted_window.bind(key, lambda event, amount=amount, unit=unit: scroll("scroll", amount, unit))
+    sorted_window.bind("<Home>", lambda event: scroll("moveto", 0))
+    sorted_window.bind("<End>", lambda event: scroll("moveto", 1))
+    jump_entry.bind("<Return>", lambda event: jump(pager.index_of_value))
+
+    redraw()
+    apply_sorted_window_appearance(sorted_window, sorted_text)
+    theme_dict = themes[theme_var.get()]
+    sorted_text.tag_configure("marked", background=theme_dict["ttk_border"])
 
-    sorted_text.insert(tk.END, "Sorted Values:\n" + sorted_values_str)
-    sorted_text.config(state=tk.DISABLED)
 
-    apply_sorted_window_appearance(sorted_window, sorted_text)
+# fit the candidate distributions on the worker and print their goodness of fit above the report.
+# the fits are cached with the analysis, so the bell curve reuses them
+def fit_distributions():
+    if not data_analysed:
+        tk.messagebox.showwarning("Warning", "No data available. Please enter and analyse data first!")
+        return
+    columns, notes, summary, decimal_places = report_columns, report_notes, analysis_cache.summary, selected_decimal_places
+
+    def fit(state):
+        fits = analysis_cache.distribution_fits(state.report)
+        text, table = format_output(columns, notes, summary, decimal_places)
+        return format_fits(fits, decimal_places) + "\n" + text, table
+
+    def show_progress(done, total):
+        progress_bar.config(maximum=max(total, 1), value=done)
+
+    # the bell curve only overlays fits that are already worked out, so an open one is redrawn with them
+    def show_fits(output):
+        set_output(*output)
+        plots_shown.pop("bell curve", None)
+        if plot_visible("bell curve"):
+            show_bell_curve()
+
+    progress_bar.grid()
+    analysis_tasks.submit(fit, on_done=show_fits, on_error=show_task_error, on_progress=show_progress)
+
+
+# group statistics window: the statistics of the analysed values for every key of another column of the
+# loaded file, or over tumbling/rolling windows along the row index (the x axis of the line plot).
+# the tables are computed on the worker thread and only their first rows are printed, export writes them all
+def group_statistics():
+    if not data_analysed:
+        tk.messagebox.showwarning("Warning", "No data available. Please enter and analyse data first!")
+        return
+
+    # any other column of a loaded file with numbers in it can be a group key
+    # the window keeps the data it was opened with, even if another column or file is analysed meanwhile
+    key_columns = []
+    if report_columns is not None:
+        names, summaries, selected = report_columns
+        table = loaded_table[0]
+        key_columns = [index for index, summary in enumerate(summaries) if summary and index != selected]
+    window_values = analysis_cache.values
+    results = [None] # last computed table, for export
+
+    group_window = tk.Toplevel()
+    group_window.title("Group Statistics")
+    group_window.columnconfigure(0, weight=1)
+    group_window.rowconfigure(1, weight=1)
+
+    controls = tk.Frame(group_window, padx=10, pady=5)
+    mode_var = tk.StringVar(value="group" if key_columns else "windows")
+    group_button = ttk.Radiobutton(controls, text="Group by column", variable=mode_var, value="group", state=tk.NORMAL if key_columns else tk.DISABLED)
+    key_picker = ttk.Combobox(controls, state="readonly", values=[names[index] for index in key_columns])
+    if key_columns:
+        key_picker.current(0)
+    windows_button = ttk.Radiobutton(controls, text="Windows of rows, size and step:", variable=mode_var, value="windows")
+    window_size_var = tk.IntVar(value=100)
+    window_size_spinbox = ttk.Spinbox(controls, from_=1, to=10 ** 9, textvariable=window_size_var, width=10)
+    window_step_var = tk.IntVar(value=100)
+    window_step_spinbox = ttk.Spinbox(controls, from_=1, to=10 ** 9, textvariable=window_step_var, width=10)
+    calculate_button = ttk.Button(controls, text="Calculate", command=lambda: calculate())
+    export_button = ttk.Button(controls, text="Export Table", command=lambda: export(), state=tk.DISABLED)
+
+    group_text = tk.Text(group_window, wrap=tk.NONE, height=20, width=90, font=("TkFixedFont", current_font_size))
+    group_text_scrollbar = ttk.Scrollbar(group_window, orient="vertical", command=group_text.yview)
+    group_text.config(yscrollcommand=group_text_scrollbar.set, state=tk.DISABLED)
+
+    controls.grid(row=0, column=0, columnspan=2, sticky='w')
+    group_button.grid(row=0, column=0, sticky='w')
+    key_picker.grid(row=0, column=1, columnspan=2, sticky='w', padx=5)
+    windows_button.grid(row=1, column=0, sticky='w')
+    window_size_spinbox.grid(row=1, column=1, padx=5)
+    window_step_spinbox.grid(row=1, column=2, padx=5)
+    calculate_button.grid(row=0, column=3, padx=5)
+    export_button.grid(row=1, column=3, padx=5)
+    group_text.grid(row=1, column=0, sticky='nsew')
+    group_text_scrollbar.grid(row=1, column=1, sticky='ns')
+
+    def show_table(result):
+        results[0] = result
+        group_text.config(state=tk.NORMAL)
+        group_text.delete("1.0", tk.END)
+        group_text.insert(tk.END, format_stats_table(result, selected_decimal_places))
+        group_text.config(state=tk.DISABLED)
+        export_button.config(state=tk.NORMAL)
+
+    def calculate():
+        if mode_var.get() == "group":
+            keys, values = table.columns[key_columns[key_picker.current()]], table.columns[selected]
+            view_tasks.submit(lambda state: group_stats(keys, values), on_done=show_table, on_error=show_task_error)
+            return
+
+        try:
+            size, step = window_size_var.get(), window_step_var.get()
+        except tk.TclError:
+            size = step = 0
+        if size < 1 or step < 1:
+            tk.messagebox.showwarning("Warning", "Invalid input! Please enter a window size and step of at least 1.", parent=group_window)
+            return
+        view_tasks.submit(lambda state: window_stats(window_values, size, step), on_done=show_table, on_error=show_task_error)
+
+    def export():
+        file_path = filedialog.asksaveasfilename(parent=group_window, defaultextension=".csv",
+                                                 filetypes=[("CSV Files", "*.csv"), ("NumPy Archives", "*.npz"), ("Parquet Files", "*.parquet")])
+        if not file_path:
+            return
+        try:
+            writer = table_writer(file_path)
+        except ValueError as error:
+            show_task_error(error)
+            return
+        columns = results[0]
+        view_tasks.submit(lambda state: writer(file_path, columns), on_error=show_task_error)
+
+    apply_theme_to_widget(group_window, themes[theme_var.get()])
+
+
+# incremental statistics over a whole dataset: exact when quantile_error is None, otherwise
+# an approximate quantile sketch with that rank error, fed in chunks so memory stays bounded.
+# state (of a worker job) is checked between blocks of values, so a cancelled job stops part way
+def build_running_stats(values, quantile_error, state=None):
+    if quantile_error is None:
+        sorted_values = np.sort(values)
+        if state:
+            state.check()
+        return RunningStats.from_sorted(sorted_values)
+    running = RunningStats.for_error(quantile_error)
+    for start in range(0, len(values), CHECK_BLOCK):
+        if state:
+            state.check()
+        running.update(values[start:start + CHECK_BLOCK])
+    return running
+
+
+# worker job for values that are already loaded, statistics are worked out in float64 whatever their dtype
+def analyse_values(values, quantile_error, state, invalid_tokens=()):
+    if len(values) == 0:
+        return values, invalid_tokens, None, None
+    floats = np.asarray(values, dtype=np.float64)
+    if quantile_error is None:
+        with profiler.span("analyse: sort"):
+            sorted_values = np.sort(floats)
+        state.check()
+        with profiler.span("analyse: statistics"):
+            summary = summarise_sorted(sorted_values)
+        state.check()
+        return values, invalid_tokens, summary, RunningStats.from_sorted(sorted_values, summary)
+    with profiler.span("analyse: approximate statistics"):
+        running = build_running_stats(floats, quantile_error, state)
+        return values, invalid_tokens, running.summary(), running
+
+
+# worker job for typed input: parse the text, then analyse the valid values.
+# they come back typed for the dataset, so whole numbers are kept as int64
+def analyse_text(numbers_input, quantile_error, state):
+    with profiler.span("analyse: parse"):
+        values, invalid_tokens = parse_numbers(numbers_input)
+    state.check()
+    values, invalid_tokens, summary, running = analyse_values(values, quantile_error, state, invalid_tokens)
+    return typed_values(values), invalid_tokens, summary, running
+
+
+# worker job for values appended after already analysed input: only the new values are parsed and
+# folded into a copy of the running statistics, the current ones stay untouched if this job is cancelled.
+# only the new values come back, the gui adds them to the end of the dataset.
+# offset is where the appended text starts in the input box, so invalid tokens point at the right place
+def analyse_appended(values, running, appended_input, offset, quantile_error, state):
+    with profiler.span("analyse: parse appended"):
+        new_values, invalid_tokens = parse_numbers(appended_input)
+    invalid_tokens = [(start + offset, token) for start, token in invalid_tokens]
+    if running is None or not running.uses_error(quantile_error):
+        running = build_running_stats(np.asarray(values, dtype=np.float64), quantile_error, state)
+    else:
+        running = running.copy()
+    state.check()
+    with profiler.span("analyse: update statistics"):
+        running.update(new_values)
+    return typed_values(new_values), invalid_tokens, running.summary(), running
+
+
+# the whole output window text as (text, table): notes about the input and the statistics of the values
+# being analysed, after the table of every column of a loaded file when it has several
+def format_output(columns, notes, summary, decimal_places):
+    table = format_columns_table(*columns, decimal_places) + "\n" if columns else ""
+    return notes + format_report(summary, decimal_places), table
+
+
+# reformat the report of the current results on the worker, for the statistics of the values outlier
+# cleaning keeps when it is on. the cleaning is cached, so turning it off and on again only reformats
+def show_report():
+    columns, notes, summary, decimal_places, cleaning = report_columns, report_notes, analysis_cache.summary, selected_decimal_places, current_cleaning
+
+    def report(state):
+        if cleaning is None:
+            return format_output(columns, notes, summary, decimal_places)
+        cleaned = analysis_cache.cleaned(*cleaning)
+        cleaned_notes = notes + format_cleaning(cleaned, decimal_places)
+        if cleaned.summary is None:
+            return cleaned_notes, format_columns_table(*columns, decimal_places) + "\n" if columns else ""
+        return format_output(columns, cleaned_notes, cleaned.summary, decimal_places)
+
+    analysis_tasks.submit(report, kind="report", on_done=lambda output: set_output(*output), on_error=show_task_error)
+
+
+# the text printed for an analysis job's result, built on the worker thread so the output window
+# gets the finished report in one update. columns is (names, summaries, selected index) for a loaded file
+def build_report(result, numbers_input, decimal_places, notes="", columns=None):
+    values, invalid_tokens, summary, running = result
+    with profiler.span("analyse: format report"):
+        if invalid_tokens:
+            notes += format_invalid_tokens(numbers_input, invalid_tokens) + "Analysing valid values input...\n"
+        report = format_output(columns, notes, summary, decimal_places) if summary is not None else ("", "")
+    return result, notes, columns, report
 
 
 # when analyse button is pressed
 def get_input():
-    global numbers, create_plot, data_analysed, selected_decimal_places
+    numbers_input = entry.get("1.0", tk.END).rstrip()
+    decimal_places = selected_decimal_places
 
     # clear output window
-    output_text.config(state=tk.NORMAL)
-    output_text.delete(1.0, tk.END)
-    output_text.config(state=tk.DISABLED)
+    set_output("")
 
-    numbers_input = entry.get("1.0", tk.END).strip()
+    # the values the job sees: a live source may add more before it finishes, show_analysis folds those in
+    snapshot = dataset.view()
 
-    # take input values and split them
-    number_strings = numbers_input.split()
+    def analyse(job, *args, columns=None, update="replace"):
+        analysis_tasks.submit(lambda state: build_report(job(*args, state), numbers_input, decimal_places, columns=columns), kind="analysis",
+                              on_done=lambda analysis: show_analysis(analysis, numbers_input, update, len(snapshot)), on_error=show_task_error)
 
-    # clear numbers list to append input values to
-    numbers = []
-
-    # define a flag to track if any valid numbers were found
-    valid_numbers_found = False
-    for number_string in number_strings:
-        try:
-            if "." in number_string:
-                numbers.append(float(number_string))
-                valid_numbers_found = True
-            else:
-                numbers.append(int(number_string))
-                valid_numbers_found = True
-        except ValueError:
-            pass
+    quantile_error = current_quantile_error if current_quantile_mode == "approx" else None
 
-    if valid_numbers_found:
-        data_analysed = True
-        if len(numbers) < len(number_strings):
-            append_to_output("Invalid input/s found. Analysing valid values input...\n")
+    appended = numbers_input[len(analysed_input):]
+    if data_analysed and numbers_input == analysed_input:
+        # unchanged input, including the preview of a loaded csv file: analyse the current values again
+        analyse(analyse_values, snapshot, quantile_error, columns=report_columns, update="keep")
+    elif data_analysed and numbers_input.startswith(analysed_input) and (appended[:1].isspace() or appended[:1] == ","):
+        # a live source keeps updating the running statistics on this thread, so the job starts from the snapshot instead
+        running = running_stats if live_ingest is None else None
+        analyse(analyse_appended, snapshot, running, appended, len(analysed_input), quantile_error, update="append")
     else:
+        analyse(analyse_text, numbers_input, quantile_error)
+
+
+# show the results of an analysis job. update says what its values are to the dataset: all of the
+# values ("replace"), values to add to the end ("append") or the dataset itself analysed again ("keep").
+# analysed is how many of the dataset's values the job was given, a live source may have added more since
+def show_analysis(analysis, numbers_input, update="replace", analysed=0):
+    global data_analysed, running_stats, analysed_input, report_notes, report_columns
+    result, notes, columns, report = analysis
+    values, invalid_tokens, summary, running_stats = result
+    mark_invalid_tokens(invalid_tokens)
+    report_columns = columns
+    show_column_picker(columns)
+
+    if summary is None:
+        data_analysed = False
+        dataset.clear()
+        analysis_cache.clear()
         tk.messagebox.showwarning("Warning", "No numerical data available. Please enter data first!")
         return
 
-    # print attributes of list
-    if numbers:
-        append_to_output("Values count: " + format_number(len(numbers), selected_decimal_places) + "\n")
-        append_to_output("Sum of values: " + format_number(sum(numbers), selected_decimal_places) + "\n")
-        append_to_output("Highest value: " + format_number(max(numbers), selected_decimal_places) + "\n")
-        append_to_output("Lowest value: " + format_number(min(numbers), selected_decimal_places) + "\n")
-        mean_result = calculate_mean(numbers)
-        append_to_output("Mean: " + format_number(mean_result, selected_decimal_places) + "\n")
-        median_result = calculate_median(numbers)
-        append_to_output("Median: " + format_number((median_result), selected_decimal_places) + "\n")
-
-        # calculate quartiles and IQR
-        q1 = np.percentile(numbers, 25)
-        q3 = np.percentile(numbers, 75)
-        iqr = q3 - q1
-
-        # calculate mode
-        count_dict = {}
-        for num in numbers:
-            count_dict[num] = count_dict.get(num, 0) + 1
-
-        max_count = max(count_dict.values())
-        modes = [format_number(num, selected_decimal_places) for num, count in count_dict.items() if count == max_count]
-
-        if len(modes) > 1:
-            append_to_output("Modes: " + ", ".join(str(mode) for mode in modes) + "\n")
-        elif len(modes) == 1:
-            append_to_output("Mode: " + str(modes[0]) + "\n")
-        else:
-            append_to_output("No unique mode found.\n")
-
-        range_result = calculate_range(numbers)
-        append_to_output("Range: " + format_number((range_result), selected_decimal_places) + "\n")
-        append_to_output("Standard Deviation: " + format_number(calculate_standard_deviation(numbers), selected_decimal_places) + "\n")
-
-        # print quartiles and IQR
-        append_to_output("First Quartile (Q1): " + format_number((q1), selected_decimal_places) + "\n")
-        append_to_output("Third Quartile (Q3): " + format_number((q3), selected_decimal_places) + "\n")
-        append_to_output("IQR: " + format_number((iqr), selected_decimal_places) + "\n" + "\n")
-
-        # calculate z score statistics
-        def z_score_statistics():
-            z_scores = calculate_z_scores()
-            within_quarter_std = sum(1 for z in z_scores if -0.25 <= z <= 0.25)
-            within_half_std = sum(1 for z in z_scores if -0.5 <= z <= 0.5)
-            within_one_std = sum(1 for z in z_scores if -1 <= z <= 1)
-            within_two_std = sum(1 for z in z_scores if -2 <= z <= 2)
-            within_three_std = sum(1 for z in z_scores if -3 <= z <= 3)
-
-            append_to_output("{}% of values are within 0.25 standard deviations of the mean\n".format(format_number(within_quarter_std / len(numbers) * 100, selected_decimal_places)))
-            append_to_output("{}% of values are within 0.5 standard deviations of the mean\n".format(format_number(within_half_std / len(numbers) * 100, selected_decimal_places)))
-            append_to_output("{}% of values are within 1 standard deviation of the mean\n".format(format_number(within_one_std / len(numbers) * 100, selected_decimal_places)))
-            append_to_output("{}% of values are within 2 standard deviations of the mean\n".format(format_number(within_two_std / len(numbers) * 100, selected_decimal_places)))
-            append_to_output("{}% of values are within 3 standard deviations of the mean\n".format(format_number(within_three_std / len(numbers) * 100, selected_decimal_places)) + "\n")
-        z_score_statistics()
-
+    data_analysed = True
+    analysed_input = numbers_input
+    report_notes = notes
+    if update == "replace":
+        show_preview_note("") # the values are now what the input box holds
+        dataset.replace(values)
     else:
-        append_to_output("No numerical values were provided.\n")
+        ingested = dataset.view()[analysed:]
+        if len(ingested):
+            running_stats.update(ingested)
+            summary = running_stats.summary()
+            report = format_output(columns, notes, summary, selected_decimal_places)
+        if update == "append":
+            dataset.extend(values)
+    analysis_cache.update(summary, running_stats.sorted_values if running_stats else None)
+    if current_cleaning:
+        show_report()
+        return
+    with profiler.span("analyse: render output"):
+        set_output(*report)
+
+
+# highlight invalid tokens in the input box, the first MAX_INVALID_MARKED are enough to find the problem
+def mark_invalid_tokens(invalid_tokens):
+    entry.tag_remove("invalid", "1.0", tk.END)
+    for start, token in invalid_tokens[:MAX_INVALID_MARKED]:
+        entry.tag_add("invalid", "1.0 + {} chars".format(start), "1.0 + {} chars".format(start + len(token)))
 
 
 # create menu bar
@@ -639,6 +1251,13 @@ def create_menu():
     # create a file menu
     file_menu = tk.Menu(menu_bar, tearoff=0)
     file_menu.add_command(label="Load CSV", command=load_csv)
+    file_menu.add_command(label="Analyse Large CSV", command=analyse_large_csv)
+    file_menu.add_command(label="Find Z-scores from CSV", command=find_z_scores_from_csv)
+    file_menu.add_command(label="Group Statistics", command=group_statistics)
+    file_menu.add_command(label="Fit Distributions", command=fit_distributions)
+    file_menu.add_command(label="Follow File (Live)", command=follow_file_live)
+    file_menu.add_command(label="Listen on Socket (Live)", command=listen_socket_live)
+    file_menu.add_command(label="Stop Live Ingest", command=stop_live_ingest)
     file_menu.add_command(label="Save Results", command=save_results)
     file_menu.add_command(label="Settings", command=settings)
     file_menu.add_separator()
@@ -666,8 +1285,10 @@ frame.pack()
 
 label = tk.Label(frame, text="Please enter a series of numbers separated by spaces or load a .CSV file:")
 entry = tk.Text(frame, wrap=tk.WORD, height=5, width=50, font=(default_font, current_font_size))
+entry.tag_configure("invalid", foreground="red", underline=True)
 output_text = tk.Text(frame, wrap=tk.WORD, height=25, width=50, font=(default_font, current_font_size))
 output_text.config(state=tk.DISABLED)
+output_text.tag_configure("table", font=("TkFixedFont", current_font_size))
 
 # input entry and label
 label.grid(row=0, column=0, columnspan=2, pady=5) # padding to add some space between buttons
@@ -675,7 +1296,7 @@ entry.grid(row=1, column=0, columnspan=2, pady=5)
 output_text.grid(row=2, column=0, columnspan=2, pady=5)
 
 # z score search
-search_label = tk.Label(frame, text="Enter value from list to find Z-score:")
+search_label = tk.Label(frame, text="Enter value/s from list to find Z-score:")
 search_label.grid(row=5, column=0)
 
 z_search_entry = tk.Entry(frame)
@@ -704,4 +1325,47 @@ output_scrollbar = ttk.Scrollbar(frame, orient="vertical", command=output_text.y
 output_scrollbar.grid(row=2, column=2, sticky='ns')
 output_text.config(yscrollcommand=output_scrollbar.set)
 
+# how much of a loaded file the input box shows, only shown when it doesn't fit
+preview_label = tk.Label(frame)
+preview_label.grid(row=9, column=0, columnspan=2)
+preview_label.grid_remove()
+
+# progress of csv loading, only shown while a file is being read
+progress_bar = ttk.Progressbar(frame, orient="horizontal", mode="determinate")
+progress_bar.grid(row=7, column=0, columnspan=2, pady=5, sticky='ew')
+progress_bar.grid_remove()
+
+# column of a loaded file that is analysed and plotted, only shown for files with several columns
+column_label = tk.Label(frame, text="Column:")
+column_label.grid(row=8, column=0)
+column_label.grid_remove()
+
+column_picker = ttk.Combobox(frame, state="readonly")
+column_picker.grid(row=8, column=1, pady=5)
+column_picker.grid_remove()
+column_picker.bind("<<ComboboxSelected>>", pick_column)
+
+# stop a running analysis or csv load
+app.bind('<Escape>', lambda event: analysis_tasks.cancel())
+
+
+# DATA_ANALYSIS_STARTUP_CHECK=1 python app.py paints the window, reports how long that took and which heavy
+# modules were already imported, then exits with status 1 when either misses its target
+def check_startup():
+    app.update()
+    elapsed = time.perf_counter() - STARTED
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print("First paint after {:.3f}s (target {:.1f}s), heavy modules loaded: {}".format(elapsed, STARTUP_TARGET, ", ".join(loaded) or "none"))
+    app.destroy()
+    sys.exit(1 if loaded or elapsed > STARTUP_TARGET else 0)
+
+
+if os.environ.get("DATA_ANALYSIS_STARTUP_CHECK"):
+    check_startup()
+
+# load the plot modules on the plot worker while the user is still typing, DATA_ANALYSIS_PREWARM=0 leaves
+# them until the first plot. a plot asked for meanwhile just waits for the import to finish
+if os.environ.get("DATA_ANALYSIS_PREWARM", "1") != "0":
+    app.after(PREWARM_DELAY, lambda: view_tasks.submit(lambda state: load_plot_modules()))
+
 app.mainloop()
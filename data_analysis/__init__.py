@@ -0,0 +1 @@
+# computation modules behind app.py, importable without tkinter or a display
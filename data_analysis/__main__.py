@@ -0,0 +1,5 @@
+import sys
+
+from data_analysis.cli import main
+
+sys.exit(main())
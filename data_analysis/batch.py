@@ -0,0 +1,88 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_analysis.external import summarise_out_of_core
+from data_analysis.loader import iter_csv_chunks, read_csv_values
+from data_analysis.online import RunningStats
+from data_analysis.stats import Z_BANDS, summarise
+from data_analysis.store import load_dataset
+
+# summary fields written to the combined results table, one row per file
+TABLE_FIELDS = ("count", "total", "minimum", "maximum", "mean", "std", "median", "q1", "q3", "iqr", "range", "mode_count", "quantile_error")
+
+
+# files to analyse, with directories expanded to the csv files directly inside them
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            files.append(path)
+    return files
+
+
+# summary of a file streamed chunk by chunk into a quantile sketch, never holding all of its values
+def summarise_approx(file_path, quantile_error):
+    running = RunningStats.for_error(quantile_error)
+    for chunk in iter_csv_chunks(file_path):
+        running.update(chunk)
+    return running.summary()
+
+
+# analyse one file, returning its summary or the error that stopped it.
+# with use_store the binary copy and cached summary next to the file are used and kept up to date,
+# with quantile_error the file is streamed through an approximate quantile sketch in bounded memory,
+# with memory_budget (bytes) it is analysed out of core, spilling to disk to keep within the budget
+def analyse_file(file_path, use_store=False, quantile_error=None, memory_budget=None):
+    try:
+        if memory_budget:
+            return summarise_out_of_core(file_path, memory_budget, quantile_error), None
+        if quantile_error:
+            return summarise_approx(file_path, quantile_error), None
+        if use_store:
+            summary = load_dataset(file_path)[1]
+            if summary is None:
+                raise ValueError("No values to analyse")
+            return summary, None
+        return summarise(read_csv_values(file_path)), None
+    except (OSError, ValueError) as error:
+        return None, str(error)
+
+
+# yield (file, summary, error) for every file, in completion order when a process pool is used
+def iter_results(files, jobs=1, use_store=False, quantile_error=None, memory_budget=None):
+    if jobs == 1 or len(files) < 2:
+        for file_path in files:
+            yield (file_path, *analyse_file(file_path, use_store, quantile_error, memory_budget))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+        futures = {pool.submit(analyse_file, file_path, use_store, quantile_error, memory_budget): file_path for file_path in files}
+        for future in as_completed(futures):
+            try:
+                summary, error = future.result()
+            except Exception as exc: # a crashed worker only fails its own file
+                summary, error = None, "{}: {}".format(type(exc).__name__, exc)
+            yield futures[future], summary, error
+
+
+# collects results into columns for write_table, failed files keep their row with the error filled in
+class ResultsTable:
+    def __init__(self):
+        self.columns = {"file": [], "error": []}
+        for field in TABLE_FIELDS:
+            self.columns[field] = []
+        self.columns["mode"] = []
+        for width in Z_BANDS:
+            self.columns["within_{:g}_std".format(width)] = []
+
+    def add(self, file_path, summary, error):
+        self.columns["file"].append(file_path)
+        self.columns["error"].append(error or "")
+        for field in TABLE_FIELDS:
+            self.columns[field].append(getattr(summary, field) if summary else float('nan'))
+        self.columns["mode"].append(float(summary.modes[0]) if summary and len(summary.modes) else float('nan'))
+        for width, fraction in zip(Z_BANDS, summary.z_bands if summary else [float('nan')] * len(Z_BANDS)):
+            self.columns["within_{:g}_std".format(width)].append(fraction)
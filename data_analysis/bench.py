@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import cached_property
+
+import numpy as np
+
+from data_analysis.columns import read_csv_table
+from data_analysis.external import summarise_out_of_core
+from data_analysis.fitting import fit_distributions
+from data_analysis.groups import group_stats
+from data_analysis.lookup import ValueIndex
+from data_analysis.online import RunningStats
+from data_analysis.parsing import parse_numbers
+from data_analysis.report import align_rows
+from data_analysis.stats import calculate_mean, calculate_median, calculate_standard_deviation, calculate_z_scores, summarise
+
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+LEGACY_LIMIT = 10 ** 6 # largest dataset the pure python stages are run on
+TEXT_LIMIT = 10 ** 7 # largest dataset written out as typed text or a csv file
+NOISE_SECONDS = 0.001 # slowdowns smaller than this are timer noise, not regressions
+NOISE_BYTES = 1 << 20
+
+# synthetic datasets, each drawn from a generator seeded by the run's seed, the distribution and the size,
+# so a dataset is the same whichever other sizes and distributions a run includes
+DISTRIBUTIONS = {
+    "uniform": lambda rng, size: rng.uniform(0, 1000, size),
+    "normal": lambda rng, size: rng.normal(100, 15, size),
+    "lognormal": lambda rng, size: rng.lognormal(3, 1, size),
+    "integers": lambda rng, size: rng.integers(0, 1000, size).astype(np.float64), # many repeated values
+}
+
+
+# the mode loop get_input used before the statistics were vectorised
+def legacy_modes(numbers):
+    count_dict = {}
+    for num in numbers:
+        count_dict[num] = count_dict.get(num, 0) + 1
+    max_count = max(count_dict.values())
+    return [num for num, count in count_dict.items() if count == max_count]
+
+
+# the statistics of the approximate quantile mode
+def approx_summary(values):
+    running = RunningStats.for_error(0.01)
+    running.update(values)
+    return running.summary()
+
+
+# build the sorted-array index and look up every 100th value
+def value_lookup(values):
+    return ValueIndex(np.sort(values), 0, 1).lookup(values[::100])
+
+
+# sort once, then fit and test every candidate distribution
+def distribution_fits(values):
+    return fit_distributions(np.sort(values))
+
+
+# a dataset in every form a stage may take, each built once and outside the timed runs
+class BenchInput:
+    def __init__(self, values, work_dir):
+        self.values = values
+        self.work_dir = work_dir
+
+    @cached_property
+    def list(self):
+        return self.values.tolist()
+
+    @cached_property
+    def text(self):
+        return " ".join(np.char.mod("%.10g", self.values))
+
+    @cached_property
+    def csv(self):
+        file_path = os.path.join(self.work_dir, "bench.csv")
+        np.savetxt(file_path, self.values.reshape(-1, 1), fmt="%.10g", header="value", comments="")
+        return file_path
+
+    @cached_property
+    def keys(self):
+        return np.arange(len(self.values)) % max(1, len(self.values) // 100) # about 100 values per group
+
+
+# (name, arguments taken from a BenchInput, job, largest size) of every stage.
+# load_csv is the file reader behind the gui's load_csv
+STAGES = (
+    ("legacy_mean", lambda data: (data.list,), calculate_mean, LEGACY_LIMIT),
+    ("legacy_median", lambda data: (data.list,), calculate_median, LEGACY_LIMIT),
+    ("legacy_std", lambda data: (data.list,), calculate_standard_deviation, LEGACY_LIMIT),
+    ("legacy_z_scores", lambda data: (data.list,), calculate_z_scores, LEGACY_LIMIT),
+    ("legacy_modes", lambda data: (data.list,), legacy_modes, LEGACY_LIMIT),
+    ("summarise", lambda data: (data.values,), summarise, None),
+    ("approx_summary", lambda data: (data.values,), approx_summary, None),
+    ("parse_text", lambda data: (data.text,), parse_numbers, TEXT_LIMIT),
+    ("load_csv", lambda data: (data.csv,), read_csv_table, TEXT_LIMIT),
+    ("out_of_core", lambda data: (data.csv,), summarise_out_of_core, TEXT_LIMIT),
+    ("group_stats", lambda data: (data.keys, data.values), group_stats, None),
+    ("value_lookup", lambda data: (data.values,), value_lookup, None),
+    ("fit_distributions", lambda data: (data.values,), distribution_fits, None),
+)
+
+
+# best wall time of repeat runs, then the peak of memory traced during one more run
+def measure(job, args, repeat, trace_memory):
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        job(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+    peak_bytes = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            job(*args)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def run(sizes, distributions, stages, repeat=3, seed=0, trace_memory=True, log=sys.stderr):
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for distribution in distributions:
+            for size in sizes:
+                rng = np.random.default_rng([seed, list(DISTRIBUTIONS).index(distribution), size])
+                bench_input = BenchInput(DISTRIBUTIONS[distribution](rng, size), work_dir)
+                for name, arguments, job, limit in STAGES:
+                    if name not in stages or (limit and size > limit):
+                        continue
+                    seconds, peak_bytes = measure(job, arguments(bench_input), repeat, trace_memory)
+                    results.append({"stage": name, "distribution": distribution, "size": size, "seconds": seconds, "peak_bytes": peak_bytes})
+                    log.write("{:<16} {:<10} {:>11} {:10.4f}s\n".format(name, distribution, size, seconds))
+                    log.flush()
+    return results
+
+
+# slowdowns (and memory growth) beyond tolerance against a baseline run, as readable lines
+def compare(results, baseline, tolerance):
+    previous = {(result["stage"], result["distribution"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["stage"], result["distribution"], result["size"]))
+        if before is None:
+            continue
+        label = "{} {} {}".format(result["stage"], result["distribution"], result["size"])
+        if result["seconds"] > before["seconds"] * (1 + tolerance) and result["seconds"] - before["seconds"] > NOISE_SECONDS:
+            regressions.append("{}: {:.4f}s, baseline {:.4f}s ({:+.0%})".format(label, result["seconds"], before["seconds"], result["seconds"] / before["seconds"] - 1))
+        if result["peak_bytes"] and before.get("peak_bytes") and result["peak_bytes"] > before["peak_bytes"] * (1 + tolerance) and result["peak_bytes"] - before["peak_bytes"] > NOISE_BYTES:
+            regressions.append("{}: peak {:.1f} MB, baseline {:.1f} MB".format(label, result["peak_bytes"] / 2 ** 20, before["peak_bytes"] / 2 ** 20))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m data_analysis.bench", description="Time the analysis stages on synthetic datasets and compare against a baseline.")
+    parser.add_argument("--sizes", nargs="+", type=lambda text: int(float(text)), default=DEFAULT_SIZES, help="dataset sizes, e.g. 1e3 1e6 1e8 (default: 1e3 to 1e6)")
+    parser.add_argument("--distributions", nargs="+", choices=sorted(DISTRIBUTIONS), default=sorted(DISTRIBUTIONS), help="distributions to draw the datasets from (default: all)")
+    parser.add_argument("--stages", nargs="+", choices=[stage[0] for stage in STAGES], default=[stage[0] for stage in STAGES], help="stages to time (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best is kept (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the datasets (default: 0)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra run that records peak memory with tracemalloc")
+    parser.add_argument("-o", "--output", help="write the results as json to this file")
+    parser.add_argument("--baseline", help="json results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline, as a fraction (default: 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(args.sizes, args.distributions, args.stages, args.repeat, args.seed, not args.no_memory)
+    output = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(output, output_file, indent=1)
+
+    rows = [["Stage", "Distribution", "Size", "Seconds", "Peak MB"]]
+    for result in results:
+        peak = "-" if result["peak_bytes"] is None else "{:.1f}".format(result["peak_bytes"] / 2 ** 20)
+        rows.append([result["stage"], result["distribution"], str(result["size"]), "{:.4f}".format(result["seconds"]), peak])
+    sys.stdout.write(align_rows(rows))
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        sys.stdout.write("REGRESSION " + regression + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+# typed array that grows by doubling, so appending chunks costs amortised O(1) per value
+class GrowableArray:
+    def __init__(self, dtype=np.float64, capacity=1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    # buffer over an existing array without copying it; the first extend moves to a larger buffer
+    @classmethod
+    def wrap(cls, values):
+        buffer = cls.__new__(cls)
+        buffer._data = np.asarray(values).ravel()
+        buffer._size = len(buffer._data)
+        return buffer
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    # copy of the filled part in another dtype, with the same spare capacity
+    def astype(self, dtype):
+        converted = GrowableArray(dtype, len(self._data))
+        converted.extend(self.view())
+        return converted
+
+    # filled part of the buffer, without copying
+    def view(self):
+        return self._data[:self._size]
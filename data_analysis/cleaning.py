@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from data_analysis.stats import Summary, sorted_percentile, summarise_sorted
+
+CLEANING_METHODS = ("z-score", "iqr", "mad")
+DEFAULT_THRESHOLDS = {"z-score": 3.0, "iqr": 1.5, "mad": 3.5} # z-score and mad in standard deviations, iqr in iqrs past the quartiles
+MAD_SCALE = 1.4826 # makes the median absolute deviation estimate the standard deviation of normal data
+
+
+# outcome of cleaning a sorted array. every method keeps the values inside [low, high], so the kept
+# values are the slice sorted_values[start:end] and the dataset itself is never copied
+@dataclass
+class Cleaning:
+    method: str
+    threshold: float
+    low: float
+    high: float
+    start: int
+    end: int
+    count: int # every value, including nan and infinities
+    non_finite: int
+    summary: Summary = None # of the kept values, None when none are left
+
+    @property
+    def kept(self):
+        return self.end - self.start
+
+    @property
+    def flagged(self):
+        return self.count - self.non_finite - self.kept
+
+
+# positions of the finite values in a sorted array: -inf sorts first, then inf and nan last
+def finite_slice(sorted_values):
+    return int(np.searchsorted(sorted_values, -np.inf, side='right')), int(np.searchsorted(sorted_values, np.inf, side='left'))
+
+
+# the range of values a method keeps, worked out from the finite sorted values
+def cleaning_bounds(finite, method, threshold):
+    if method == "z-score":
+        mean = float(finite.mean())
+        std = float(np.sqrt(np.mean(np.square(finite - mean))))
+        return mean - threshold * std, mean + threshold * std
+    if method == "iqr":
+        q1, q3 = sorted_percentile(finite, 25), sorted_percentile(finite, 75)
+        return q1 - threshold * (q3 - q1), q3 + threshold * (q3 - q1)
+    if method == "mad":
+        median = sorted_percentile(finite, 50)
+        mad = float(np.median(np.abs(finite - median))) * MAD_SCALE
+        return median - threshold * mad, median + threshold * mad
+    raise ValueError("Cleaning method must be one of {}".format(", ".join(CLEANING_METHODS)))
+
+
+# clean an already sorted array by method, keeping its finite values within the method's bounds
+def clean_sorted(sorted_values, method, threshold):
+    first, last = finite_slice(sorted_values)
+    cleaning = Cleaning(method, threshold, np.nan, np.nan, first, first, len(sorted_values), len(sorted_values) - (last - first))
+    if last == first:
+        return cleaning
+    cleaning.low, cleaning.high = cleaning_bounds(sorted_values[first:last], method, threshold)
+    cleaning.start = int(np.searchsorted(sorted_values, cleaning.low, side='left'))
+    cleaning.end = max(cleaning.start, int(np.searchsorted(sorted_values, cleaning.high, side='right')))
+    if cleaning.kept:
+        cleaning.summary = summarise_sorted(sorted_values[cleaning.start:cleaning.end])
+    return cleaning
+
+
+# True for the values a cleaning keeps, in their original order. nan compares false, so it is never kept
+def kept_mask(values, low, high):
+    mask = np.greater_equal(values, low)
+    mask &= np.less_equal(values, high)
+    return mask
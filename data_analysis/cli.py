@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+
+from data_analysis.batch import ResultsTable, expand_paths, iter_results
+from data_analysis.external import DEFAULT_MEMORY_BUDGET
+from data_analysis.report import format_report
+from data_analysis.tables import table_writer
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m data_analysis", description="Analyse the numbers in one or more csv files without opening the gui.")
+    parser.add_argument("files", nargs="+", help="csv files, or directories of csv files, to analyse")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="report format (default: text)")
+    parser.add_argument("--decimal-places", type=int, default=2, help="decimal places in the text report (default: 2)")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes analysing files in parallel, 0 for one per cpu (default: 1)")
+    parser.add_argument("--approx", type=float, metavar="ERROR", help="stream each file through an approximate quantile sketch with this rank error (e.g. 0.01), using bounded memory")
+    parser.add_argument("--out-of-core", action="store_true", help="analyse each file without loading it, spilling sorted runs and mode buckets to a temporary directory; exact unless --approx is given")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET // 2 ** 20, metavar="MB", help="memory an --out-of-core analysis may use per file (default: %(default)s)")
+    parser.add_argument("--store", action="store_true", help="reuse and keep a binary copy plus cached summary next to each file")
+    parser.add_argument("--table", help="also write one row per file to this .csv, .npz or .parquet table")
+    args = parser.parse_args(argv)
+    if args.decimal_places < 0:
+        parser.error("--decimal-places must not be negative")
+    if args.jobs < 0:
+        parser.error("--jobs must not be negative")
+    if args.approx is not None and not 0 < args.approx < 1:
+        parser.error("--approx must be between 0 and 1")
+    if args.memory_budget <= 0:
+        parser.error("--memory-budget must be positive")
+    return args
+
+
+def write_text(file_path, summary, error, decimal_places, out):
+    out.write("== {} ==\n".format(file_path))
+    if error:
+        out.write("Error: {}\n\n".format(error))
+    else:
+        out.write(format_report(summary, decimal_places))
+
+
+def write_json(file_path, summary, error, first, out):
+    if error:
+        result = {"file": file_path, "error": error}
+    else:
+        result = {"file": file_path, **summary.to_dict()}
+    out.write("[\n" if first else ",\n")
+    out.write(json.dumps(result))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    memory_budget = args.memory_budget * 2 ** 20 if args.out_of_core else None
+    files = expand_paths(args.files)
+    if args.table:
+        try:
+            write_table = table_writer(args.table)
+        except ValueError as error:
+            sys.exit("error: {}".format(error))
+    table = ResultsTable() if args.table else None
+    failures = 0
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        # each file's report is written as soon as it is ready
+        for index, (file_path, summary, error) in enumerate(iter_results(files, args.jobs, args.store, args.approx, memory_budget)):
+            if args.format == "json":
+                write_json(file_path, summary, error, index == 0, out)
+            else:
+                write_text(file_path, summary, error, args.decimal_places, out)
+            out.flush()
+            if table:
+                table.add(file_path, summary, error)
+            failures += bool(error)
+        if args.format == "json":
+            out.write("\n]\n" if files else "[]\n")
+    finally:
+        if args.output:
+            out.close()
+
+    if table:
+        write_table(args.table, table.columns)
+    return 1 if failures else 0
@@ -0,0 +1,126 @@
+import csv
+import io
+import math
+import warnings
+
+import numpy as np
+
+from data_analysis.buffer import GrowableArray
+from data_analysis.loader import CHUNK_SIZE, iter_csv_text, split_header
+
+INTEGER_LIMIT = 2 ** 53 # beyond this float64 can't hold every integer, so such columns stay float
+
+
+# a csv file as one typed array per column: int64 when every cell is a whole number, otherwise
+# float64 with nan for blank or non-numeric cells
+class ColumnTable:
+    def __init__(self, names, columns):
+        self.names = list(names)
+        self.columns = list(columns)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    # every column as float64 side by side, column-major so each column is contiguous
+    def matrix(self):
+        matrix = np.empty((len(self), len(self.columns)), dtype=np.float64, order='F')
+        for index, column in enumerate(self.columns):
+            matrix[:, index] = column
+        return matrix
+
+    # the numeric cells of one column, without the nan of missing cells
+    def values(self, index):
+        column = self.columns[index]
+        if column.dtype.kind == 'f':
+            missing = np.isnan(column)
+            if missing.any():
+                return column[~missing]
+        return column
+
+    # every column's 8-byte cells side by side for the binary copy: float64 columns as they are and int64
+    # columns as their own bits, so loading the copy back needs no conversion
+    def cells(self):
+        cells = np.empty((len(self), len(self.columns)), dtype=np.float64, order='F')
+        for index, column in enumerate(self.columns):
+            cells[:, index] = np.ascontiguousarray(column).view(np.float64) if column.dtype == np.int64 else column
+        return cells
+
+    # columns of a matrix. with dtypes it is the cells of a binary copy, and each column is a view of its
+    # cells in its own dtype, so a memory-mapped copy is never read into memory; otherwise every column is float64
+    @classmethod
+    def from_matrix(cls, names, matrix, dtypes=None):
+        if dtypes is None:
+            return cls(names, [matrix[:, index].astype(np.float64, copy=False) for index in range(matrix.shape[1])])
+        return cls(names, [matrix[:, index].view(dtype) for index, dtype in enumerate(dtypes)])
+
+
+# slow path for lines numpy can't read: short rows are padded to width cells and the block is widened
+# to its longest row, anything that isn't a finite number becomes nan
+def parse_csv_rows(text, width):
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row:
+            continue
+        cells = []
+        for item in row:
+            try:
+                value = float(item)
+            except ValueError:
+                value = np.nan
+            cells.append(value if math.isfinite(value) else np.nan)
+        rows.append(cells)
+    width = max([width] + [len(cells) for cells in rows])
+    return np.array([cells + [np.nan] * (width - len(cells)) for cells in rows], dtype=np.float64).reshape(-1, width)
+
+
+# parse a block of whole csv lines into a (rows, at least width) matrix, using numpy's c parser when it can
+def parse_csv_block(text, width):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # loadtxt warns about empty input
+            block = np.loadtxt(io.StringIO(text), delimiter=',', comments=None, dtype=np.float64, ndmin=2)
+        if block.size == 0:
+            return block.reshape(-1, width)
+        if block.shape[1] >= width:
+            block[~np.isfinite(block)] = np.nan
+            return block
+    except ValueError:
+        pass
+    return parse_csv_rows(text, width)
+
+
+# float64 column holding only whole numbers, without missing cells, as int64
+def narrow_column(column):
+    if len(column) and np.all(np.abs(column) < INTEGER_LIMIT) and np.all(column == np.trunc(column)):
+        return column.astype(np.int64)
+    return column
+
+
+# read a csv file column by column. the first line that isn't blank names the columns when it holds any text,
+# otherwise the columns are numbered and the line is data. rows longer than the header add numbered columns,
+# missing from the rows before them, so no cell is left out
+def read_csv_table(file_path, chunk_size=CHUNK_SIZE, progress=None, hasher=None):
+    names = None
+    columns = []
+    for text in iter_csv_text(file_path, chunk_size, progress, hasher):
+        if names is None:
+            cells, is_header, rest = split_header(text)
+            if cells is None:
+                continue
+            names = cells if is_header else ["column {}".format(index + 1) for index in range(len(cells))]
+            columns = [GrowableArray() for _ in names]
+            if is_header:
+                text = rest
+        block = parse_csv_block(text, len(names))
+        for index in range(len(names), block.shape[1]):
+            names.append("column {}".format(index + 1))
+            columns.append(GrowableArray())
+            columns[-1].extend(np.full(len(columns[0]), np.nan))
+        for index, column in enumerate(columns):
+            column.extend(block[:, index])
+    if names is None:
+        return ColumnTable([], [])
+    return ColumnTable(names, [narrow_column(column.view()) for column in columns])
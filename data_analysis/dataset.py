@@ -0,0 +1,67 @@
+import numpy as np
+
+from data_analysis.buffer import GrowableArray
+from data_analysis.columns import narrow_column
+
+
+# int64 when every value is a whole number that float64 holds exactly, float64 otherwise
+def typed_values(values):
+    values = np.asarray(values).ravel()
+    if values.dtype.kind in 'biu':
+        return values.astype(np.int64, copy=False)
+    return narrow_column(values.astype(np.float64, copy=False))
+
+
+# values in one of the two dtypes a dataset holds, keeping the one they have: no pass over the values
+# unless they are neither int64 nor float64
+def dataset_values(values):
+    values = np.asarray(values).ravel()
+    return values.astype(np.int64 if values.dtype.kind in 'biu' else np.float64, copy=False)
+
+
+# the values being analysed, in one contiguous typed buffer that grows by doubling.
+# values are only ever added past the end or swapped for a new buffer, so an array returned by view()
+# stays a valid snapshot while the dataset changes; version goes up with every change, for caches
+# of anything derived from the values
+class Dataset:
+    def __init__(self, values=()):
+        self.version = 0
+        self._buffer = GrowableArray.wrap(dataset_values(values))
+
+    def __len__(self):
+        return len(self._buffer)
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    # the current values as a read-only ndarray, without copying
+    def view(self):
+        values = self._buffer.view()
+        values.flags.writeable = False
+        return values
+
+    # take over values as the whole dataset, without copying. they are kept in the dtype they come in,
+    # so whole numbers should already be int64 (e.g. from typed_values or a loaded column, on a worker thread)
+    def replace(self, values):
+        self._buffer = GrowableArray.wrap(dataset_values(values))
+        self.version += 1
+
+    # append values, narrowed to int64 when they are all whole numbers; appended batches are small
+    def extend(self, values):
+        values = typed_values(values)
+        if len(values) == 0:
+            return
+        if len(self._buffer) == 0:
+            self.replace(values)
+            return
+        if values.dtype != self._buffer.dtype:
+            # whole numbers only fit an int64 dataset, anything else turns it into float64
+            if self._buffer.dtype == np.int64:
+                self._buffer = self._buffer.astype(np.float64)
+            values = values.astype(np.float64)
+        self._buffer.extend(values)
+        self.version += 1
+
+    def clear(self):
+        self.replace(())
@@ -0,0 +1,221 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from data_analysis.loader import iter_csv_chunks
+from data_analysis.online import UPDATE_CHUNK
+from data_analysis.sketch import QuantileSketch, sketch_size_for_error
+from data_analysis.stats import Z_BANDS, Summary, select_percentile
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024 # bytes an out-of-core analysis may hold in memory at once
+MIN_MEMORY_BUDGET = 4 * 1024 * 1024
+MAX_BUCKETS = 256 # spill files values are hashed into when counting modes
+MAX_SPLIT_DEPTH = 3 # times an oversized bucket is hashed again before it is counted in blocks
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15) # fibonacci hashing of the value bits
+
+
+# how a memory budget is shared out: bytes of csv text parsed at a time (the parsed chunk, its sorted run and
+# the bucket partitioning take about 20 bytes per byte of text at worst) and values counted per mode block
+def budget_sizes(memory_budget):
+    memory_budget = max(memory_budget, MIN_MEMORY_BUDGET)
+    return memory_budget // 24, memory_budget // 32
+
+
+# bucket of every value, a different salt giving an independent split of the same values
+def _hash_buckets(values, buckets, salt):
+    mixed = (values.view(np.uint64) ^ np.uint64(salt)) * HASH_MULTIPLIER
+    return ((mixed >> np.uint64(40)) % np.uint64(buckets)).astype(np.intp)
+
+
+# append each value to the spill file of its hash bucket
+def _spill(values, files, salt):
+    bucket_ids = _hash_buckets(values, len(files), salt)
+    order = np.argsort(bucket_ids, kind='stable')
+    ends = np.cumsum(np.bincount(bucket_ids, minlength=len(files)))
+    grouped = values[order]
+    start = 0
+    for spill_file, end in zip(files, ends.tolist()):
+        if end > start:
+            spill_file.write(grouped[start:end].tobytes())
+        start = end
+
+
+# exact count, total, mean, variance and range of values streamed in chunks, combined with chan et al.'s update
+class Moments:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._m2 = 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def update(self, values):
+        count = len(values)
+        batch_mean = float(values.mean())
+        total = self.count + count
+        delta = batch_mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += float(np.sum(np.square(values - batch_mean))) + delta * delta * self.count * count / total
+        self.count = total
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+
+# sorted runs written one after another to a spill file, each chunk sorted on its own (the first half of an
+# external sort). ranks and counts are answered by binary search in every run, so the runs never need merging
+class SortedRuns:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._lengths = []
+        self._runs = None
+
+    def add(self, values):
+        self._file.write(np.sort(values).tobytes())
+        self._lengths.append(len(values))
+
+    # memory-mapped runs, once every chunk has been added
+    def runs(self):
+        if self._runs is None:
+            self._file.close()
+            data = np.memmap(self.path, dtype=np.float64, mode='r') if sum(self._lengths) else np.empty(0)
+            ends = np.cumsum(self._lengths).tolist()
+            self._runs = [data[end - length:end] for end, length in zip(ends, self._lengths)]
+        return self._runs
+
+    def close(self):
+        self._file.close()
+        self._runs = None
+
+    # number of values below x (or at most x with side='right'), vectorized over x
+    def rank(self, x, side='right'):
+        return sum(np.searchsorted(run, x, side=side) for run in self.runs())
+
+    # linear-interpolated percentile, same method as sorted_percentile
+    def percentile(self, q, count, minimum, maximum):
+        return select_percentile(self.rank, q, count, minimum, maximum)
+
+
+# values in a spill file with the highest count, counted block by block; the (value, count) pairs kept between
+# blocks stay small because hashing already split the distinct values across buckets
+def _count_bucket(path, block):
+    data = np.memmap(path, dtype=np.float64, mode='r')
+    unique, counts = np.empty(0), np.empty(0, dtype=np.int64)
+    for start in range(0, len(data), block):
+        block_unique, block_counts = np.unique(data[start:start + block], return_counts=True)
+        if len(unique):
+            unique, inverse = np.unique(np.concatenate((unique, block_unique)), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate((counts, block_counts)), minlength=len(unique)).astype(np.int64)
+        else:
+            unique, counts = block_unique, block_counts
+    del data
+    highest = int(counts.max())
+    return unique[counts == highest], highest
+
+
+# modes over every hash bucket, an oversized bucket being hashed again with a new salt
+def _bucket_modes(paths, block, depth=0):
+    modes, mode_count = [], 0
+    for path in paths:
+        size = os.path.getsize(path) // 8
+        if size == 0:
+            continue
+        if size <= block or depth == MAX_SPLIT_DEPTH:
+            bucket_modes, bucket_count = _count_bucket(path, block)
+        else:
+            bucket_modes, bucket_count = _bucket_modes(_split_bucket(path, block, depth + 1), block, depth + 1)
+        if bucket_count > mode_count:
+            modes, mode_count = [bucket_modes], bucket_count
+        elif bucket_count == mode_count:
+            modes.append(bucket_modes)
+        os.remove(path)
+    return (np.sort(np.concatenate(modes)) if modes else np.empty(0)), mode_count
+
+
+def _split_bucket(path, block, salt):
+    paths = ["{}.{}".format(path, index) for index in range(min(MAX_BUCKETS, os.path.getsize(path) // 8 // block + 1))]
+    files = [open(sub_path, 'wb') for sub_path in paths]
+    try:
+        data = np.memmap(path, dtype=np.float64, mode='r')
+        for start in range(0, len(data), block):
+            _spill(np.array(data[start:start + block]), files, salt)
+        del data
+    finally:
+        for spill_file in files:
+            spill_file.close()
+    return paths
+
+
+# summary of a csv file too large for memory, streamed in chunks sized from memory_budget (bytes).
+# count, total, range, mean and std are exact. modes are exact, counted from values spilled to hash buckets
+# on disk. quantiles and z bands are exact from chunk-sorted runs on disk, or with quantile_error from a
+# bounded sketch without the runs. spill files go to a temporary directory under spill_dir
+def summarise_out_of_core(file_path, memory_budget=DEFAULT_MEMORY_BUDGET, quantile_error=None, progress=None, spill_dir=None):
+    chunk_size, block = budget_sizes(memory_budget)
+    bucket_count = max(1, min(MAX_BUCKETS, os.path.getsize(file_path) * 4 // (block * 8) + 1))
+    moments = Moments()
+    sketch = QuantileSketch(sketch_size_for_error(quantile_error)) if quantile_error else None
+
+    with tempfile.TemporaryDirectory(prefix="data-analysis-", dir=spill_dir) as spill_path:
+        bucket_paths = [os.path.join(spill_path, "bucket{}".format(index)) for index in range(bucket_count)]
+        runs = None if sketch is not None else SortedRuns(os.path.join(spill_path, "runs"))
+        bucket_files = [open(path, 'wb') for path in bucket_paths]
+        try:
+            for chunk in iter_csv_chunks(file_path, chunk_size, progress):
+                values = chunk[~np.isnan(chunk)]
+                if len(values) == 0:
+                    continue
+                values += 0.0 # -0.0 becomes 0.0, so equal values hash alike
+                moments.update(values)
+                _spill(values, bucket_files, 0)
+                if sketch is not None:
+                    for start in range(0, len(values), UPDATE_CHUNK):
+                        sketch.update(values[start:start + UPDATE_CHUNK])
+                else:
+                    runs.add(values)
+        finally:
+            for bucket_file in bucket_files:
+                bucket_file.close()
+
+        if moments.count == 0:
+            if runs is not None:
+                runs.close()
+            raise ValueError("No values to analyse")
+        count, mean, std = moments.count, moments.mean, moments.std
+        modes, mode_count = _bucket_modes(bucket_paths, block)
+
+        widths = np.asarray(Z_BANDS) * std
+        if sketch is not None:
+            percentile = sketch.percentile
+            rank = sketch.rank
+        else:
+            percentile = lambda q: runs.percentile(q, count, moments.minimum, moments.maximum)
+            rank = runs.rank
+        z_bands = tuple(1.0 for _ in Z_BANDS) if std == 0 else \
+            tuple(float(x) for x in (rank(mean + widths, side='right') - rank(mean - widths, side='left')) / count)
+        summary = Summary(
+            count=count,
+            total=moments.total,
+            minimum=moments.minimum,
+            maximum=moments.maximum,
+            mean=mean,
+            std=std,
+            median=percentile(50),
+            q1=percentile(25),
+            q3=percentile(75),
+            modes=modes,
+            mode_count=mode_count,
+            z_bands=z_bands,
+            quantile_error=sketch.rank_error if sketch is not None else 0.0,
+        )
+        if runs is not None:
+            runs.close()
+        return summary
@@ -0,0 +1,199 @@
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import ListedColormap, LogNorm
+from matplotlib.figure import Figure
+
+from data_analysis.plotting import draw_histogram, update_histogram
+
+FIGURE_SIZE = (6.4, 4.8) # inches, the size pyplot figures had
+DENSITY_COLOURS = ListedColormap(colormaps['Blues'](np.linspace(0.4, 1, 256)))
+LINE_MARKERS = (("Q1", 0.25, 'r'), ("Q3", 0.75, 'g'), ("Median", 0.5, 'orange')) # label, position along the x axis, colour
+Z_LINES = range(-3, 4) # standard deviations from the mean marked on the bell curve
+
+
+# axis limits around the data with matplotlib's default 5% margin, widened when all the data is one value
+def set_limits(ax, x_min, x_max, y_min, y_max):
+    for set_limit, low, high in ((ax.set_xlim, x_min, x_max), (ax.set_ylim, y_min, y_max)):
+        margin = (high - low) * 0.05 or 0.5
+        set_limit(low - margin, high + margin)
+
+
+# one figure per plot type that keeps its artists between results. create adds them once, change moves
+# them to what the plot's prepare step returned, so a new result never builds a new figure.
+# the figure is plain matplotlib, not registered with pyplot, so it is freed with its window
+class PersistentPlot:
+    title = ""
+    xlabel = ""
+    ylabel = ""
+
+    def __init__(self):
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title(self.title)
+        self.ax.set_xlabel(self.xlabel)
+        self.ax.set_ylabel(self.ylabel)
+        self.artists = None
+
+    def update(self, prepared):
+        if self.artists is None:
+            self.artists = self.create()
+        self.change(prepared)
+        self.rescale()
+
+    def rescale(self):
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+
+# legend of the artists given, or none at all when there aren't any
+def show_legend(ax, handles):
+    if handles:
+        ax.legend(handles=handles)
+    elif ax.get_legend():
+        ax.get_legend().remove()
+
+
+class HistogramPlot(PersistentPlot):
+    title, xlabel, ylabel = 'Histogram of input values', 'Value', 'Frequency'
+
+    def create(self):
+        bars = draw_histogram(self.ax, np.zeros(1), np.arange(2.0))
+        flagged = self.ax.stairs(np.zeros(1), np.arange(2.0), fill=True, color='red', alpha=0.6, label='Flagged outliers')
+        return bars, flagged
+
+    # flagged_counts, the values per bin an outlier cleaning removed, are drawn over the bars when given
+    def change(self, prepared):
+        counts, edges, flagged_counts = prepared
+        bars, flagged = self.artists
+        update_histogram(bars, counts, edges)
+        flagged.set_visible(flagged_counts is not None)
+        if flagged_counts is not None:
+            flagged.set_data(flagged_counts, edges)
+        show_legend(self.ax, [flagged] if flagged_counts is not None else [])
+
+
+class LinePlot(PersistentPlot):
+    title, xlabel, ylabel = 'Line plot of input values', 'Index', 'Value'
+
+    def create(self):
+        line, = self.ax.plot([], [], color='blue', linestyle='-', linewidth=2)
+        markers = [(self.ax.axvline(0, color=colour, linestyle='--', label=label), self.ax.text(0, 0, "", color=colour, ha='center', va='bottom'))
+                   for label, _, colour in LINE_MARKERS]
+        self.ax.legend()
+        return line, markers
+
+    # long lines arrive as per-bucket minima and maxima, drawn without a marker on every point
+    def change(self, prepared):
+        plot_type, x, y, count, highest, q1, median, q3 = prepared
+        line, markers = self.artists
+        line.set_data(x, y)
+        line.set_marker('o' if plot_type == 'line' else 'None')
+        for (label, position, _), (vertical, text), value in zip(LINE_MARKERS, markers, (q1, q3, median)):
+            vertical.set_xdata([count * position] * 2)
+            text.set_position((count * position, highest))
+            text.set_text(f'{label}: {value}')
+
+
+class ScatterPlot(PersistentPlot):
+    title, xlabel, ylabel = 'Scatter plot of unsorted input values', 'Index', 'Value'
+
+    # big scatters arrive as a density grid, shown as an image in place of the markers
+    def create(self):
+        points = self.ax.scatter([], [], color='blue', marker='o')
+        density = self.ax.imshow(np.zeros((1, 1)), origin='lower', aspect='auto', interpolation='nearest', cmap=DENSITY_COLOURS, norm=LogNorm(vmin=1, vmax=2))
+        return points, density
+
+    def change(self, prepared):
+        plot_type, y = prepared
+        points, density = self.artists
+        points.set_visible(plot_type == 'scatter')
+        density.set_visible(plot_type == 'density')
+        if plot_type == 'scatter':
+            points.set_offsets(np.column_stack((np.arange(len(y)), y)))
+            set_limits(self.ax, 0, len(y) - 1, float(y.min()), float(y.max()))
+        else:
+            counts, x_edges, y_edges = y
+            density.set_data(np.ma.masked_equal(counts, 0).T)
+            density.set_extent((x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+            density.set_norm(LogNorm(vmin=1, vmax=max(counts.max(), 2)))
+            self.ax.set_xlim(x_edges[0], x_edges[-1])
+            self.ax.set_ylim(y_edges[0], y_edges[-1])
+
+    # the limits are set by change, collections are not part of relim
+    def rescale(self):
+        pass
+
+
+class BoxPlot(PersistentPlot):
+    title = 'Box plot of input values'
+
+    # a single box at height 1, its ticks set here as bxp would otherwise add another set with every box
+    def create(self):
+        self.ax.set_yticks([1], ["1"])
+        self.ax.set_ylim(0.5, 1.5)
+        return []
+
+    # bxp has no way to move an existing box, so only this plot's own few artists are replaced.
+    # flagged_points, a sample of the values an outlier cleaning removed, are marked on the box's line when given
+    def change(self, prepared):
+        box_stats, flagged_points = prepared
+        for artist in self.artists:
+            artist.remove()
+        self.artists.clear()
+        for artists in self.ax.bxp(box_stats, vert=False, manage_ticks=False).values():
+            self.artists.extend(artists)
+
+        q1, median, q3 = box_stats[0]['q1'], box_stats[0]['med'], box_stats[0]['q3']
+        # approximate quartiles carry their rank error guarantee
+        error = " (±{:.2g}%)".format(box_stats[0]['rank_error'] * 100) if box_stats[0].get('rank_error') else ""
+        for label, value, height in (("Q1", q1, 1.4), ("Median", median, 1.2), ("Q3", q3, 1.3)):
+            self.artists.append(self.ax.annotate(f"{label}: {value:.2f}{error}", xy=(value, 1.1), xytext=(value, height),
+                                                 arrowprops=dict(facecolor='black', arrowstyle="->"), ha='center'))
+        if flagged_points is not None:
+            self.artists.extend(self.ax.plot(flagged_points, np.ones(len(flagged_points)), 'x', color='red', label='Flagged outliers'))
+        show_legend(self.ax, self.artists[-1:] if flagged_points is not None else [])
+
+    def rescale(self):
+        self.ax.relim()
+        self.ax.autoscale_view(scaley=False)
+
+
+class BellCurvePlot(PersistentPlot):
+    title, xlabel, ylabel = 'Bell Curve (Normal Distribution)', 'Value', 'Density'
+
+    def create(self):
+        histogram = draw_histogram(self.ax, np.zeros(1), np.arange(2.0), alpha=0.5, color='g')
+        curve, = self.ax.plot([], [], color='blue', label='Normal')
+        fit_curve, = self.ax.plot([], [], color='darkorange', linestyle='-.')
+        lines = [self.ax.axvline(0, alpha=0.6, color='red', linestyle='--') for _ in Z_LINES]
+        labels = [self.ax.text(0, 0, f'Z={i}', color='red', ha='center', va='bottom') if i else None for i in Z_LINES]
+        return histogram, curve, fit_curve, lines, labels
+
+    # best_fit is (name, ks distance, density at x) of the best fitting distribution, or None
+    def change(self, prepared):
+        mean, std, density, edges, x, y, best_fit = prepared
+        histogram, curve, fit_curve, lines, labels = self.artists
+        update_histogram(histogram, density, edges)
+        curve.set_data(x, y)
+        if best_fit:
+            name, ks, fit_y = best_fit
+            fit_curve.set_data(x, fit_y)
+            fit_curve.set_label('Best fit: {} (KS={:.4f})'.format(name, ks))
+            show_legend(self.ax, [curve, fit_curve])
+        else:
+            fit_curve.set_data([], [])
+            show_legend(self.ax, [])
+        for i, line, label in zip(Z_LINES, lines, labels):
+            line.set_xdata([mean + i * std] * 2)
+            if label:
+                label.set_position((mean + i * std, max(y) / 10))
+
+
+# plot name -> (tab title, figure class) for the plot window
+PLOTS = {
+    "histogram": ("Histogram", HistogramPlot),
+    "line plot": ("Line Plot", LinePlot),
+    "scatter plot": ("Scatter Plot", ScatterPlot),
+    "box plot": ("Box Plot", BoxPlot),
+    "bell curve": ("Bell Curve", BellCurvePlot),
+}
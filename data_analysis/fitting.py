@@ -0,0 +1,154 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import stats
+from scipy.special import digamma, gammainc, gammaincc, ndtr, polygamma
+
+from data_analysis.cleaning import finite_slice
+
+DISTRIBUTIONS = ("normal", "lognormal", "exponential", "gamma", "uniform")
+FIT_CHUNK = 1 << 20 # values transformed at a time, so fitting never holds another array the size of the data
+GAMMA_ITERATIONS = 20 # newton steps refining the gamma shape, it converges in a handful
+PROBABILITY_FLOOR = 1e-300 # probabilities are clipped here before their log, so a value at the edge of a fit adds a large but finite penalty
+
+
+# a fitted candidate and how far the sorted values are from it: ks is the kolmogorov-smirnov distance
+# (largest gap between the empirical and fitted cdf), ad the anderson-darling statistic (weights the tails)
+@dataclass
+class Fit:
+    name: str
+    parameters: dict # parameter name -> estimate
+    distribution: object # frozen scipy.stats distribution
+    ks: float
+    ad: float
+
+
+def _chunks(values):
+    for start in range(0, len(values), FIT_CHUNK):
+        yield start, values[start:start + FIT_CHUNK]
+
+
+# mean and population standard deviation of transform(values), two passes over chunks
+def _mean_std(values, transform=None):
+    total = 0.0
+    for _, chunk in _chunks(values):
+        total += float(np.sum(transform(chunk) if transform else chunk))
+    mean = total / len(values)
+    squares = 0.0
+    for _, chunk in _chunks(values):
+        deviations = (transform(chunk) if transform else chunk) - mean
+        squares += float(np.dot(deviations, deviations))
+    return mean, math.sqrt(squares / len(values))
+
+
+# maximum likelihood gamma shape from the mean and the mean of the logs: minka's closed form start,
+# then newton's method on log(k) - digamma(k) = log(mean) - mean(log x)
+def gamma_shape(mean, mean_log):
+    s = math.log(mean) - mean_log
+    if s <= 0:
+        return None
+    shape = (3 - s + math.sqrt((s - 3) ** 2 + 24 * s)) / (12 * s)
+    for _ in range(GAMMA_ITERATIONS):
+        step = (math.log(shape) - float(digamma(shape)) - s) / (1 / shape - float(polygamma(1, shape)))
+        shape = max(shape - step, shape / 10)
+        if abs(step) < 1e-12 * shape:
+            break
+    return shape
+
+
+# ks and ad statistics of sorted values against a fitted distribution, in one pass over chunks.
+# cdf_sf(values) returns the cdf and survival function (1 - cdf) of values. the ad sum pairs the i-th
+# smallest value's log cdf with the i-th largest value's log survival, which regroups as a weight on
+# each value's own log cdf and log survival
+def goodness_of_fit(sorted_values, cdf_sf, progress=None):
+    count = len(sorted_values)
+    ks, ad = 0.0, 0.0
+    for start, chunk in _chunks(sorted_values):
+        if progress:
+            progress(start)
+        rank = np.arange(start + 1, start + len(chunk) + 1, dtype=np.float64)
+        cdf, sf = cdf_sf(chunk)
+        ks = max(ks, float(np.max(rank / count - cdf)), float(np.max(cdf - (rank - 1) / count)))
+        log_cdf = np.log(np.maximum(cdf, PROBABILITY_FLOOR))
+        log_sf = np.log(np.maximum(sf, PROBABILITY_FLOOR))
+        ad += float(np.dot(2 * rank - 1, log_cdf) + np.dot(2 * count - 2 * rank + 1, log_sf))
+    return ks, -count - ad / count
+
+
+# cdf and survival function of each candidate, straight from the scipy.special ufuncs: the frozen
+# scipy.stats distributions check their arguments on every call, which costs more than the function itself.
+# the survival function is evaluated directly, 1 - cdf would round to 0 through the upper tail
+def normal_cdf_sf(mean, std):
+    return lambda x: (ndtr((x - mean) / std), ndtr((mean - x) / std))
+
+
+def lognormal_cdf_sf(mu, sigma):
+    return lambda x: normal_cdf_sf(mu, sigma)(np.log(x))
+
+
+# the incomplete gamma functions are slow, so each value gets only one: the cdf below the mean (x / scale
+# under shape) and the survival function above it, the other being 1 minus it without losing precision
+def gamma_cdf_sf(shape, scale):
+    def cdf_sf(x):
+        x = x / scale
+        split = np.searchsorted(x, shape) # the chunks are sorted
+        cdf, sf = np.empty_like(x), np.empty_like(x)
+        gammainc(shape, x[:split], out=cdf[:split])
+        gammaincc(shape, x[split:], out=sf[split:])
+        np.subtract(1, cdf[:split], out=sf[:split])
+        np.subtract(1, sf[split:], out=cdf[split:])
+        return cdf, sf
+    return cdf_sf
+
+
+def exponential_cdf_sf(scale):
+    return lambda x: (-np.expm1(-x / scale), np.exp(-x / scale))
+
+
+def uniform_cdf_sf(low, high):
+    def cdf_sf(x):
+        cdf = np.clip((x - low) / (high - low), 0, 1)
+        return cdf, 1 - cdf
+    return cdf_sf
+
+
+# (name, parameters, frozen distribution, cdf_sf) of every candidate that can describe the values. lognormal
+# and gamma need positive values and exponential non-negative ones; every estimate is maximum likelihood
+# except the uniform range, widened by one expected gap so the end values are not at probability 0 or 1
+def candidate_fits(finite):
+    count, minimum, maximum = len(finite), float(finite[0]), float(finite[-1])
+    mean, std = _mean_std(finite)
+    candidates = [("normal", {"mean": mean, "std": std}, stats.norm(mean, std), normal_cdf_sf(mean, std))]
+    if minimum > 0:
+        mean_log, std_log = _mean_std(finite, np.log)
+        if std_log > 0:
+            candidates.append(("lognormal", {"mu": mean_log, "sigma": std_log}, stats.lognorm(std_log, scale=math.exp(mean_log)),
+                               lognormal_cdf_sf(mean_log, std_log)))
+        shape = gamma_shape(mean, mean_log)
+        if shape:
+            candidates.append(("gamma", {"shape": shape, "scale": mean / shape}, stats.gamma(shape, scale=mean / shape),
+                               gamma_cdf_sf(shape, mean / shape)))
+    if minimum >= 0:
+        candidates.append(("exponential", {"scale": mean}, stats.expon(scale=mean), exponential_cdf_sf(mean)))
+    gap = (maximum - minimum) / (count - 1)
+    low, high = minimum - gap, maximum + gap
+    candidates.append(("uniform", {"low": low, "high": high}, stats.uniform(low, high - low), uniform_cdf_sf(low, high)))
+    return candidates
+
+
+# every candidate fitted to the finite values of a sorted array, best (smallest ks distance) first.
+# empty when there are fewer than two distinct finite values. progress(done, total) is called between
+# chunks of the goodness of fit tests, which take most of the time
+def fit_distributions(sorted_values, progress=None):
+    first, last = finite_slice(sorted_values)
+    finite = np.asarray(sorted_values[first:last], dtype=np.float64)
+    if len(finite) < 2 or finite[0] == finite[-1]:
+        return []
+    candidates = candidate_fits(finite)
+    fits = []
+    for index, (name, parameters, distribution, cdf_sf) in enumerate(candidates):
+        done = index * len(finite)
+        tested = (lambda start: progress(done + start, len(candidates) * len(finite))) if progress else None
+        fits.append(Fit(name, parameters, distribution, *goodness_of_fit(finite, cdf_sf, tested)))
+    return sorted(fits, key=lambda fit: fit.ks)
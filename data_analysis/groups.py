@@ -0,0 +1,121 @@
+import numpy as np
+
+# columns of a group or window statistics table, after the key or window bounds
+GROUP_FIELDS = ("count", "mean", "std", "minimum", "q1", "median", "q3", "maximum", "mode", "mode_count")
+WINDOW_BATCH = 1 << 22 # values sorted at a time for overlapping windows, bounds the memory they need
+
+
+# statistics of consecutive segments of sorted_values, segment i being sorted_values[starts[i]:starts[i] + counts[i]].
+# the segments cover the whole array in order, so every statistic is a reduceat or an indexed read
+# over all segments at once; the mode is the smallest of a segment's most frequent values
+def segment_stats(sorted_values, starts, counts):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(sorted_values, starts) / counts
+        deviations = sorted_values - np.repeat(means, counts)
+        stds = np.sqrt(np.add.reduceat(np.square(deviations, out=deviations), starts) / counts)
+
+    def percentile(q):
+        position = (counts - 1) * q / 100
+        lower = position.astype(np.intp)
+        upper = np.minimum(lower + 1, counts - 1)
+        low_values = sorted_values[starts + lower]
+        return low_values + (sorted_values[starts + upper] - low_values) * (position - lower)
+
+    # runs of equal values, never crossing a segment boundary
+    boundaries = np.zeros(len(sorted_values), dtype=bool)
+    boundaries[starts] = True
+    boundaries[1:] |= sorted_values[1:] != sorted_values[:-1]
+    run_starts = np.flatnonzero(boundaries)
+    run_lengths = np.diff(run_starts, append=len(sorted_values))
+    first_runs = np.searchsorted(run_starts, starts)
+    mode_counts = np.maximum.reduceat(run_lengths, first_runs)
+    runs_per_segment = np.diff(first_runs, append=len(run_starts))
+    mode_runs = np.flatnonzero(run_lengths == np.repeat(mode_counts, runs_per_segment))
+    modes = sorted_values[run_starts[mode_runs[np.searchsorted(mode_runs, first_runs)]]]
+
+    return {
+        "count": counts,
+        "mean": means,
+        "std": stds,
+        "minimum": sorted_values[starts],
+        "q1": percentile(25),
+        "median": percentile(50),
+        "q3": percentile(75),
+        "maximum": sorted_values[starts + counts - 1],
+        "mode": modes,
+        "mode_count": mode_counts,
+    }
+
+
+# codes of keys below 2**32 in the same order as the keys: whole-number keys spanning less than 2**32 are
+# their distance from the smallest key, other keys the rank of their value among the distinct keys
+def key_codes(keys):
+    if keys.dtype.kind in 'iu' or np.all(keys == np.trunc(keys)):
+        low = keys.min()
+        if keys.max() - low < 2 ** 32:
+            return (keys - low).astype(np.uint64)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    codes = np.empty(len(keys), dtype=np.uint64)
+    codes[order] = np.concatenate(([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1], dtype=np.uint64)))
+    return codes
+
+
+# statistics of values for every distinct key, one row per key in ascending order.
+# rows with a missing key or value are left out. the values are sorted once, then each row's key code
+# and the rank of its value are packed into one uint64 (code above, rank below) and sorted, which orders
+# the rows by key and then value without a stable sort: each group is contiguous and sorted, in
+# O(n log n) with no loop over groups. it needs fewer than 2**32 rows
+def group_stats(keys, values):
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    if keys.dtype.kind == 'f':
+        present &= ~np.isnan(keys)
+    keys, values = keys[present], values[present]
+    if len(values) == 0:
+        return {"key": keys, **{field: np.empty(0) for field in GROUP_FIELDS}}
+
+    order = np.argsort(values)
+    packed = key_codes(keys)[order] << np.uint64(32)
+    packed |= np.arange(len(values), dtype=np.uint64)
+    packed.sort()
+    order = order[(packed & np.uint64(0xFFFFFFFF)).astype(np.intp)]
+    packed >>= np.uint64(32)
+    starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+    counts = np.diff(starts, append=len(values))
+    return {"key": keys[order[starts]], **segment_stats(values[order], starts, counts)}
+
+
+# statistics of values over windows of size rows along the row index, a new window every step rows.
+# step defaults to size (tumbling windows, the last one may be shorter); a smaller step gives rolling
+# windows, which only cover whole windows. windows are sorted as rows of a 2-d array, a batch at a time
+def window_stats(values, size, step=None):
+    values = np.asarray(values, dtype=np.float64)
+    step = step or size
+    if size < 1 or step < 1:
+        raise ValueError("Window size and step must be at least 1")
+
+    if step >= size:
+        window_starts = np.arange(0, len(values), step)
+        window_ends = np.minimum(window_starts + size, len(values))
+    else:
+        window_starts = np.arange(0, max(len(values) - size + 1, 0), step)
+        window_ends = window_starts + size
+
+    batches = []
+    per_batch = max(1, WINDOW_BATCH // size)
+    for first in range(0, len(window_starts), per_batch):
+        starts, ends = window_starts[first:first + per_batch], window_ends[first:first + per_batch]
+        full = ends - starts == size
+        windows = np.sort(values[starts[full, None] + np.arange(size)], axis=1)
+        # a shorter last tumbling window is sorted on its own and added as one more segment
+        sorted_values = np.concatenate([windows.ravel()] + [np.sort(values[start:end]) for start, end in zip(starts[~full], ends[~full])])
+        counts = ends - starts
+        segment_starts = np.concatenate(([0], np.cumsum(counts[:-1])))
+        batches.append(segment_stats(sorted_values, segment_starts, counts))
+
+    columns = {"start": window_starts, "end": window_ends}
+    for field in GROUP_FIELDS:
+        columns[field] = np.concatenate([batch[field] for batch in batches]) if batches else np.empty(0)
+    return columns
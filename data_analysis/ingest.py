@@ -0,0 +1,149 @@
+import os
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from data_analysis.parsing import parse_numbers
+
+QUEUE_BATCHES = 64 # parsed batches waiting for the gui, further batches are dropped and counted
+READ_SIZE = 64 * 1024 # bytes read from a file or socket at a time
+POLL_INTERVAL = 0.2 # seconds between checks of a followed file for new data, and socket read timeout
+SEPARATORS = (b"\n", b"\r", b"\t", b" ", b",")
+
+
+# bytes appended to a growing file, from its current end (or its start with from_start).
+# a file that is truncated or replaced, e.g. by log rotation, is followed again from its start
+def follow_file(file_path, stopped, from_start=False):
+    source = open(file_path, 'rb')
+    try:
+        if not from_start:
+            source.seek(0, os.SEEK_END)
+        while not stopped.is_set():
+            block = source.read(READ_SIZE)
+            if block:
+                yield block
+                continue
+            try:
+                current = os.stat(file_path)
+            except OSError:
+                current = None # moved away and not recreated yet
+            if current and (current.st_ino != os.fstat(source.fileno()).st_ino or current.st_size < source.tell()):
+                source.close()
+                source = open(file_path, 'rb')
+                continue
+            stopped.wait(POLL_INTERVAL)
+    finally:
+        source.close()
+
+
+# (protocol, host, port) of an address such as tcp://127.0.0.1:9000 or udp://0.0.0.0:9000
+def parse_address(address):
+    parts = urlsplit(address)
+    if parts.scheme not in ("tcp", "udp") or not parts.hostname or parts.port is None:
+        raise ValueError("Expected an address like tcp://127.0.0.1:9000 or udp://127.0.0.1:9000")
+    return parts.scheme, parts.hostname, parts.port
+
+
+# bytes from a socket: a tcp server the app connects to, or a udp port it listens on.
+# each datagram is a separate batch of numbers, so a newline is added between them
+def read_socket(address, stopped):
+    protocol, host, port = parse_address(address)
+    if protocol == "tcp":
+        connection = socket.create_connection((host, port), timeout=POLL_INTERVAL * 10)
+    else:
+        connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        connection.bind((host, port))
+    with connection:
+        connection.settimeout(POLL_INTERVAL)
+        while not stopped.is_set():
+            try:
+                block = connection.recv(READ_SIZE)
+            except socket.timeout:
+                continue
+            if protocol == "udp":
+                yield block + b"\n"
+            elif block:
+                yield block
+            else:
+                return # the server closed the connection
+
+
+# reads a source on its own thread, parses what arrives and queues the values in batches for the gui to
+# drain at its own pace. the queue is bounded: when the gui falls behind, new batches are dropped and
+# counted rather than held, so memory stays flat however fast the source is.
+# source(stopped) yields bytes until it ends or the stopped event is set
+class LiveIngest:
+    def __init__(self, name, source, max_batches=QUEUE_BATCHES):
+        self.name = name
+        self.received = 0 # values parsed, whether they were queued or dropped
+        self.dropped = 0 # values in batches dropped because the queue was full
+        self.invalid = 0 # tokens that were not numbers
+        self.peak_backlog = 0 # most batches seen waiting at a drain
+        self.error = None
+        self.started = None
+        self.batches = queue.Queue(max_batches)
+        self._source = source
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    # the reader notices within POLL_INTERVAL, values already queued can still be drained
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def backlog(self):
+        return self.batches.qsize()
+
+    # values received per second since the start
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        return self.received / elapsed if elapsed else 0.0
+
+    def _run(self):
+        leftover = b""
+        try:
+            for block in self._source(self._stopped):
+                # only whole tokens are parsed, a number split across reads waits for the rest of it
+                data = leftover + block
+                cut = max(data.rfind(separator) for separator in SEPARATORS) + 1
+                data, leftover = data[:cut], data[cut:]
+                if data:
+                    self._queue(data)
+            if leftover:
+                self._queue(leftover)
+        except (OSError, ValueError) as error:
+            self.error = error
+
+    def _queue(self, data):
+        values, invalid_tokens = parse_numbers(data.decode('utf-8', errors='replace'))
+        self.invalid += len(invalid_tokens)
+        if len(values) == 0:
+            return
+        self.received += len(values)
+        try:
+            self.batches.put_nowait(values)
+        except queue.Full:
+            self.dropped += len(values)
+
+    # every batch waiting, as one array
+    def drain(self):
+        self.peak_backlog = max(self.peak_backlog, self.backlog)
+        batches = []
+        while True:
+            try:
+                batches.append(self.batches.get_nowait())
+            except queue.Empty:
+                return np.concatenate(batches) if batches else np.empty(0)
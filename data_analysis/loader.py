@@ -0,0 +1,106 @@
+import csv
+import io
+import math
+import os
+import warnings
+
+import numpy as np
+
+from data_analysis.buffer import GrowableArray
+
+CHUNK_SIZE = 4 * 1024 * 1024 # bytes of file parsed per chunk
+
+
+# numeric cells of some csv lines, skipping blanks, headers, nan, infinities and anything else that isn't a number
+def parse_csv_cells(text):
+    values = []
+    for row in csv.reader(io.StringIO(text)):
+        for item in row:
+            try:
+                value = float(item)
+            except ValueError:
+                continue
+            if math.isfinite(value):
+                values.append(value)
+    return np.array(values, dtype=np.float64)
+
+
+# cells of the first line of text that isn't blank, whether it is a header, and the text after it.
+# a line is a header when any of its cells is text rather than a number, its numbers are then names and not data.
+# cells is None when every line of text is blank
+def split_header(text):
+    while text:
+        line, _, text = text.partition("\n")
+        cells = next(csv.reader([line]), [])
+        if not any(cell.strip() for cell in cells):
+            continue
+        for cell in cells:
+            try:
+                if cell.strip():
+                    float(cell)
+            except ValueError:
+                return [cell.strip() or "column {}".format(index + 1) for index, cell in enumerate(cells)], True, text
+        return cells, False, text
+    return None, False, ""
+
+
+# parse a block of whole csv lines, using numpy's c parser when every cell is numeric.
+# loadtxt reads nan and inf cells too, those are dropped like any other cell that isn't a number
+def parse_csv_chunk(text):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # loadtxt warns about empty input
+            values = np.loadtxt(io.StringIO(text), delimiter=',', comments=None, dtype=np.float64, ndmin=1).ravel()
+    except ValueError:
+        return parse_csv_cells(text)
+    finite = np.isfinite(values)
+    return values if finite.all() else values[finite]
+
+
+# yield the text of a csv file one chunk of whole lines at a time.
+# hasher (e.g. hashlib.blake2b()) is fed the raw bytes, so the file can be fingerprinted in the same read
+def iter_csv_text(file_path, chunk_size=CHUNK_SIZE, progress=None, hasher=None):
+    total_bytes = os.path.getsize(file_path)
+    bytes_read = 0
+    leftover = b""
+    first_chunk = True
+    with open(file_path, 'rb') as csvfile:
+        while True:
+            block = csvfile.read(chunk_size)
+            bytes_read += len(block)
+            if hasher:
+                hasher.update(block)
+            data = leftover + block
+            if block:
+                cut = data.rfind(b"\n") + 1
+                data, leftover = data[:cut], data[cut:]
+            if data:
+                yield data.decode('utf-8-sig' if first_chunk else 'utf-8')
+                first_chunk = False
+            if progress:
+                progress(bytes_read, total_bytes)
+            if not block:
+                return
+
+
+# yield the numeric values of a csv file one chunk of whole lines at a time. the header is found the same
+# way as for read_csv_table, so every way of reading a file counts the same cells
+def iter_csv_chunks(file_path, chunk_size=CHUNK_SIZE, progress=None, hasher=None):
+    header_found = False
+    for text in iter_csv_text(file_path, chunk_size, progress, hasher):
+        if not header_found:
+            cells, is_header, rest = split_header(text)
+            if cells is None:
+                continue
+            header_found = True
+            if is_header:
+                text = rest
+        yield parse_csv_chunk(text)
+
+
+# read every numeric cell of a csv file into one float64 array
+def read_csv_values(file_path, chunk_size=CHUNK_SIZE, progress=None, hasher=None):
+    values = GrowableArray()
+    for chunk in iter_csv_chunks(file_path, chunk_size, progress, hasher):
+        values.extend(chunk)
+    return values.view()
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+# answers for a batch of query values, one array entry per query
+@dataclass
+class Lookup:
+    values: np.ndarray
+    counts: np.ndarray # how many times each value occurs in the dataset
+    ranks: np.ndarray # 1-based position the value has (or would have) in the sorted dataset
+    percentiles: np.ndarray # percent of values below it, counting equal values as half below
+    z_scores: np.ndarray
+
+    @property
+    def present(self):
+        return self.counts > 0
+
+
+# index over the sorted values of a dataset, built once per dataset.
+# every query is two binary searches, so a batch of m values costs O(m log n) in one vectorised call
+class ValueIndex:
+    def __init__(self, sorted_values, mean, std):
+        self.sorted_values = np.asarray(sorted_values, dtype=np.float64)
+        self.mean = mean
+        self.std = std
+
+    def lookup(self, values):
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        # searching in sorted order walks the index front to back instead of jumping around it,
+        # several times faster for large batches
+        order = np.argsort(values, kind="stable")
+        below = np.empty(len(values), dtype=np.intp)
+        counts = np.empty(len(values), dtype=np.intp)
+        below[order] = np.searchsorted(self.sorted_values, values[order], side="left")
+        counts[order] = np.searchsorted(self.sorted_values, values[order], side="right") - below[order]
+        percentiles = (below + counts / 2) / len(self.sorted_values) * 100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_scores = (values - self.mean) / self.std
+        return Lookup(values, counts, below + 1, percentiles, z_scores)
@@ -0,0 +1,227 @@
+import math
+
+import numpy as np
+
+from data_analysis.sketch import DEFAULT_SKETCH_SIZE, QuantileSketch, sketch_size_for_error
+from data_analysis.stats import Z_BANDS, Summary, select_percentile, sorted_modes, sorted_percentile, sorted_z_bands
+
+QUANTILE_MODES = ("exact", "approx")
+UPDATE_CHUNK = 1 << 16 # values fed to a sketch at a time, so building one never copies the whole dataset
+
+
+# merge two sorted arrays into a new one, in O(len(a) + len(b))
+def merge_sorted(a, b):
+    return np.insert(a, np.searchsorted(a, b), b)
+
+
+# statistics that can be updated with appended values and merged with another accumulator.
+# quantiles='exact' keeps every value in sorted runs, which also answer modes and z bands exactly;
+# quantiles='approx' keeps a bounded QuantileSketch instead, with modes counted in a dict if track_mode.
+# the sorted runs grow like a binary counter: a new run is merged with the last one only while that is not
+# larger, so there are at most log2(n) runs and k appended values cost O(k log n) amortised, rather than
+# the O(n) of merging them into one sorted array every time. summaries search every run without merging.
+# while no value repeats every value is a mode: the runs hold them, rather than a set of every value
+class RunningStats:
+    def __init__(self, quantiles="exact", track_mode=True, sketch_size=DEFAULT_SKETCH_SIZE):
+        if quantiles not in QUANTILE_MODES:
+            raise ValueError("quantiles must be one of {}".format(", ".join(QUANTILE_MODES)))
+        self.quantiles = quantiles
+        self.track_mode = track_mode
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.mode_count = 0
+        self._m2 = 0.0 # sum of squared differences from the mean (welford)
+        self._modes = set()
+        self._runs = [] if quantiles == "exact" else None # sorted arrays, largest first
+        self._sketch = QuantileSketch(sketch_size) if quantiles == "approx" else None
+        self._counts = {} if quantiles == "approx" and track_mode else None
+
+    # exact accumulator over values that are already sorted, e.g. the array an analysis just sorted
+    @classmethod
+    def from_sorted(cls, sorted_values, summary=None):
+        running = cls("exact")
+        if len(sorted_values) == 0:
+            return running
+        sorted_values = np.asarray(sorted_values, dtype=np.float64)
+        running._runs = [sorted_values]
+        running.count = len(sorted_values)
+        running.total = float(sorted_values.sum()) if summary is None else summary.total
+        running.mean = running.total / running.count
+        running._m2 = float(np.sum(np.square(sorted_values - running.mean)))
+        running.minimum = float(sorted_values[0])
+        running.maximum = float(sorted_values[-1])
+        modes, running.mode_count = sorted_modes(sorted_values) if summary is None else (summary.modes, summary.mode_count)
+        if running.mode_count > 1:
+            running._modes = set(np.asarray(modes).tolist())
+        return running
+
+    # approximate accumulator whose quantiles stay within the given normalised rank error
+    @classmethod
+    def for_error(cls, error, track_mode=False):
+        return cls("approx", track_mode, sketch_size_for_error(error))
+
+    # whether this accumulator keeps quantiles the way quantile_error asks for (None meaning exact)
+    def uses_error(self, quantile_error):
+        if quantile_error is None:
+            return self.quantiles == "exact"
+        return self.quantiles == "approx" and self._sketch.k == sketch_size_for_error(quantile_error)
+
+    # every value sorted, when an exact accumulator holds them in a single run (as it does after from_sorted);
+    # None while appended runs are unmerged, or for an approximate accumulator
+    @property
+    def sorted_values(self):
+        if self._runs is None or len(self._runs) > 1:
+            return None
+        return self._runs[0] if self._runs else np.empty(0)
+
+    # number of values at most x (or below x with side='left'), over every sorted run
+    def _rank(self, x, side='right'):
+        return sum(np.searchsorted(run, x, side=side) for run in self._runs)
+
+    def _add_run(self, run):
+        self._runs.append(run)
+        while len(self._runs) > 1 and len(self._runs[-2]) <= len(self._runs[-1]):
+            run = self._runs.pop()
+            self._runs[-1] = merge_sorted(self._runs[-1], run)
+
+    # add sorted runs, then offer the new counts of their values as modes
+    def _add_sorted(self, runs):
+        for run in runs:
+            self._add_run(run)
+        unique = np.unique(np.concatenate(runs))
+        counts = self._rank(unique) - self._rank(unique, side='left')
+        if counts.max() == 1 and self.mode_count <= 1:
+            self.mode_count = 1 # still no repeats
+        else:
+            self._offer_modes(unique, counts)
+
+    # every value sorted, merging the runs (without keeping the result) when there are several
+    def _merged(self):
+        if not self._runs:
+            return np.empty(0)
+        merged = self._runs[-1]
+        for run in reversed(self._runs[:-1]):
+            merged = merge_sorted(run, merged)
+        return merged
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    # chan et al.'s pairwise update, combining this accumulator with another group's count, mean and m2
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def _offer_modes(self, values, counts):
+        if len(counts) == 0:
+            return
+        highest = int(counts.max())
+        if highest > self.mode_count:
+            self.mode_count = highest
+            self._modes = set(values[counts == highest].tolist())
+        elif highest == self.mode_count:
+            self._modes.update(values[counts == highest].tolist())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        batch_mean = float(values.mean())
+        self._combine(len(values), batch_mean, float(np.sum(np.square(values - batch_mean))))
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+        if self._runs is not None:
+            self._add_sorted([np.sort(values)])
+        else:
+            for start in range(0, len(values), UPDATE_CHUNK):
+                self._sketch.update(values[start:start + UPDATE_CHUNK])
+            if self._counts is not None:
+                unique, batch_counts = np.unique(values, return_counts=True)
+                counts = np.array([self._counts.get(value, 0) + count for value, count in zip(unique.tolist(), batch_counts.tolist())])
+                self._counts.update(zip(unique.tolist(), counts.tolist()))
+                self._offer_modes(unique, counts)
+
+    def merge(self, other):
+        if other.quantiles != self.quantiles:
+            raise ValueError("Cannot merge exact and approximate accumulators")
+        if other.count == 0:
+            return
+        self._combine(other.count, other.mean, other._m2)
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+        if self._runs is not None:
+            self._add_sorted(other._runs)
+        else:
+            self._sketch.merge(other._sketch)
+            if self._counts is not None and other._counts is not None:
+                for value, count in other._counts.items():
+                    self._counts[value] = self._counts.get(value, 0) + count
+                self.mode_count = max(self._counts.values())
+                self._modes = {value for value, count in self._counts.items() if count == self.mode_count}
+            else:
+                self._counts = None
+                self.mode_count = 0
+                self._modes = set()
+
+    # independent accumulator sharing the (never modified in place) arrays, cheap enough to take before each update
+    def copy(self):
+        duplicate = RunningStats.__new__(RunningStats)
+        duplicate.__dict__.update(self.__dict__)
+        duplicate._modes = set(self._modes)
+        if self._runs is not None:
+            duplicate._runs = list(self._runs)
+        if self._sketch is not None:
+            duplicate._sketch = self._sketch.copy()
+        if self._counts is not None:
+            duplicate._counts = dict(self._counts)
+        return duplicate
+
+    def _band_fractions(self, rank):
+        if self.std == 0:
+            return tuple(1.0 for _ in Z_BANDS)
+        widths = np.asarray(Z_BANDS) * self.std
+        inside = rank(self.mean + widths, side='right') - rank(self.mean - widths, side='left')
+        return tuple(float(x) for x in inside / self.count)
+
+    def summary(self):
+        if self.count == 0:
+            raise ValueError("No values to analyse")
+        if self._runs is not None and len(self._runs) == 1:
+            percentile = lambda q: sorted_percentile(self._runs[0], q)
+            z_bands = sorted_z_bands(self._runs[0], self.mean, self.std)
+        elif self._runs is not None:
+            percentile = lambda q: select_percentile(self._rank, q, self.count, self.minimum, self.maximum)
+            z_bands = self._band_fractions(self._rank)
+        else:
+            percentile = self._sketch.percentile
+            z_bands = self._band_fractions(self._sketch.rank)
+        if self._runs is not None and self.mode_count == 1:
+            modes = self._merged()
+        else:
+            modes = np.sort(np.fromiter(self._modes, dtype=np.float64, count=len(self._modes)))
+        return Summary(
+            count=self.count,
+            total=self.total,
+            minimum=self.minimum,
+            maximum=self.maximum,
+            mean=self.mean,
+            std=self.std,
+            median=percentile(50),
+            q1=percentile(25),
+            q3=percentile(75),
+            modes=modes,
+            mode_count=self.mode_count,
+            z_bands=z_bands,
+            quantile_error=self._sketch.rank_error if self._sketch is not None else 0.0,
+        )
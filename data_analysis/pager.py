@@ -0,0 +1,45 @@
+import numpy as np
+
+from data_analysis.report import format_number
+
+
+# pages through sorted values a screenful at a time, only the rows on screen are ever formatted.
+# positions are 0-based row indices of the top visible row
+class SortedPager:
+    def __init__(self, sorted_values, rows=20):
+        self.sorted_values = sorted_values
+        self.rows = rows
+        self.top = 0
+
+    def __len__(self):
+        return len(self.sorted_values)
+
+    # move the top row, kept so that the last page is still full
+    def scroll_to(self, top):
+        self.top = int(max(0, min(top, len(self) - self.rows)))
+        return self.top
+
+    def scroll_by(self, rows):
+        return self.scroll_to(self.top + rows)
+
+    # fractions of the data shown, in the form a tk scrollbar expects
+    def fractions(self):
+        if len(self) == 0:
+            return 0.0, 1.0
+        return self.top / len(self), min(1.0, (self.top + self.rows) / len(self))
+
+    # first row holding value, or where it would be inserted when it is not in the data
+    def index_of_value(self, value):
+        return int(np.searchsorted(self.sorted_values, value, side="left"))
+
+    def index_of_percentile(self, percentile):
+        return int(round(min(max(percentile, 0), 100) / 100 * (len(self) - 1)))
+
+    # the visible rows numbered by their rank in the sorted data
+    def page(self, decimal_places):
+        end = min(self.top + self.rows, len(self))
+        width = len(str(len(self)))
+        return [
+            "{:>{}}  {}".format(index + 1, width, format_number(value, decimal_places))
+            for index, value in zip(range(self.top, end), self.sorted_values[self.top:end].tolist())
+        ]
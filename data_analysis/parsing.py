@@ -0,0 +1,43 @@
+import math
+import re
+import warnings
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[^\s,]+") # a token is anything between spaces, tabs, newlines or commas
+
+
+# split typed input into numbers, returning them with the (character offset, token) of every invalid token.
+# nan and infinities (including numbers too large for a float) are invalid, as they would spoil every statistic.
+# the whole text goes through numpy's C parser in one call; only when that stops at something that
+# is not a number, or reads something that is not finite, is the text walked token by token to find out what and where it is
+def parse_numbers(numbers_input):
+    text = numbers_input.replace(",", " ")
+    if not text.strip():
+        return np.empty(0), [] # fromstring reads blank text as [-1.]
+    try:
+        with warnings.catch_warnings():
+            # older numpy versions only warn when parsing stops early instead of raising
+            warnings.simplefilter("error", DeprecationWarning)
+            numbers = np.fromstring(text, dtype=np.float64, sep=" ")
+    except (DeprecationWarning, ValueError):
+        return parse_tokens(numbers_input)
+    if not np.isfinite(numbers).all():
+        return parse_tokens(numbers_input)
+    return numbers, []
+
+
+# slow path, one float() per token
+def parse_tokens(numbers_input):
+    numbers = []
+    invalid_tokens = []
+    for match in TOKEN_PATTERN.finditer(numbers_input):
+        try:
+            number = float(match.group())
+        except ValueError:
+            number = math.nan
+        if math.isfinite(number):
+            numbers.append(number)
+        else:
+            invalid_tokens.append((match.start(), match.group()))
+    return np.array(numbers, dtype=np.float64), invalid_tokens
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+# box plot statistics in the form matplotlib's bxp draws, built from already known quartiles
+# (e.g. approximate ones) with one vectorized pass for the whiskers and outliers instead of a sort
+def box_stats_from_quartiles(values, q1, median, q3, rank_error=0.0):
+    iqr = q3 - q1
+    low_fence = q1 - 1.5 * iqr
+    high_fence = q3 + 1.5 * iqr
+    outside = (values < low_fence) | (values > high_fence)
+    inside = values[~outside]
+    return [{
+        'med': median,
+        'q1': q1,
+        'q3': q3,
+        'iqr': iqr,
+        'mean': float(values.mean()),
+        'whislo': float(inside.min()) if len(inside) else q1,
+        'whishi': float(inside.max()) if len(inside) else q3,
+        'fliers': values[outside],
+        'rank_error': rank_error,
+    }]
+
+
+DIRECT_PLOT_LIMIT = 10000 # below this many points plots are drawn from the raw values
+LINE_BUCKETS = 2000 # about one bucket per horizontal pixel of a plot window
+DENSITY_BINS = (600, 300) # horizontal and vertical cells of the scatter density grid
+
+
+# keep the lowest and highest point of each of `buckets` equal runs of a series, in index order.
+# a line drawn through them looks the same as the full series at screen resolution, whatever its length
+def decimate_minmax(y, buckets=LINE_BUCKETS):
+    if len(y) <= 2 * buckets:
+        return np.arange(len(y)), y
+    size = len(y) // buckets
+    full = y[:size * buckets].reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    indices = np.concatenate((starts + full.argmin(axis=1), starts + full.argmax(axis=1)))
+    tail = y[size * buckets:]
+    if len(tail):
+        indices = np.concatenate((indices, size * buckets + np.array([tail.argmin(), tail.argmax()])))
+    indices = np.unique(indices)
+    return indices, y[indices]
+
+
+# counts of points per cell of a fixed grid, drawn instead of millions of scatter markers.
+# returns (counts, x_edges, y_edges) like np.histogram2d, but bins with a single bincount
+def density_grid(x, y, bins=DENSITY_BINS):
+    x_bins, y_bins = bins
+    x_edges = np.linspace(x.min(), x.max(), x_bins + 1)
+    y_edges = np.linspace(y.min(), y.max(), y_bins + 1)
+    x_cells = np.clip(((x - x_edges[0]) * (x_bins / max(x_edges[-1] - x_edges[0], 1e-300))).astype(np.int64), 0, x_bins - 1)
+    y_cells = np.clip(((y - y_edges[0]) * (y_bins / max(y_edges[-1] - y_edges[0], 1e-300))).astype(np.int64), 0, y_bins - 1)
+    counts = np.bincount(x_cells * y_bins + y_cells, minlength=x_bins * y_bins).reshape(x_bins, y_bins)
+    return counts, x_edges, y_edges
+
+
+# height of the black line on each bin edge: up to the lower of the two bars it separates, or the outer bar
+def edge_heights(counts):
+    return np.concatenate((counts[:1], np.minimum(counts[:-1], counts[1:]), counts[-1:]))
+
+
+# a histogram from precomputed bins, as filled stairs with a black edge on every bar.
+# returns the artists, so update_histogram can later move them to new bins
+def draw_histogram(ax, counts, edges, **style):
+    fill = ax.stairs(counts, edges, fill=True, **style)
+    outline = ax.stairs(counts, edges, color='black')
+    bar_edges = ax.vlines(edges, 0, edge_heights(counts), colors='black', linewidth=1)
+    return fill, outline, bar_edges
+
+
+def update_histogram(artists, counts, edges):
+    fill, outline, bar_edges = artists
+    fill.set_data(counts, edges)
+    outline.set_data(counts, edges)
+    bar_edges.set_segments(np.stack((np.column_stack((edges, np.zeros(len(edges)))), np.column_stack((edges, edge_heights(counts)))), axis=1))
+
+
+# at most one outlier per horizontal pixel bucket: overlapping markers on a box plot look the same
+def thin_points(values, buckets=LINE_BUCKETS):
+    if len(values) <= buckets:
+        return values
+    cells = ((values - values.min()) * (buckets / max(values.max() - values.min(), 1e-300))).astype(np.int64)
+    return values[np.unique(cells, return_index=True)[1]]
+
+
+# counts per bin of already sorted values, binned like np.histogram (the last bin includes its right edge)
+# by binary search instead of a pass over the values
+def sorted_histogram(sorted_values, edges):
+    positions = np.searchsorted(sorted_values, edges, side='left')
+    positions[-1] = np.searchsorted(sorted_values, edges[-1], side='right')
+    return np.diff(positions)
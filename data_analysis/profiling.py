@@ -0,0 +1,133 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+ENV_VAR = "DATA_ANALYSIS_PROFILE" # 1 records timings, "memory" also traces allocations
+MAX_RECORDS = 10000 # oldest spans are dropped beyond this
+
+
+# timings (and optionally traced memory) of named stages, recorded from any thread.
+# a disabled profiler hands out a shared do-nothing context, so instrumented code costs one attribute check
+class Profiler:
+    def __init__(self, enabled=False, memory=False):
+        self.enabled = enabled
+        self.records = deque(maxlen=MAX_RECORDS)
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._open_spans = 0
+        self._memory = False
+        self.memory = memory
+
+    @classmethod
+    def from_environment(cls):
+        setting = os.environ.get(ENV_VAR, "").strip().lower()
+        return cls(enabled=setting not in ("", "0", "false", "no"), memory=setting == "memory")
+
+    # tracing memory slows python code down several times, so it is a separate switch
+    @property
+    def memory(self):
+        return self._memory
+
+    @memory.setter
+    def memory(self, memory):
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not memory and self._memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._memory = memory
+
+    def span(self, name):
+        if not self.enabled:
+            return _NOT_RECORDING
+        return self._span(name)
+
+    # function recording a span around every call, for jobs handed to a task runner
+    def wrap(self, name, function):
+        def wrapped(*args, **kwargs):
+            with self.span(name):
+                return function(*args, **kwargs)
+        return wrapped
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        memory = self._memory and tracemalloc.is_tracing()
+        if memory:
+            with self._lock:
+                # peaks are measured from when the outermost open span started, so a nested span's peak is an upper bound
+                if self._open_spans == 0:
+                    tracemalloc.reset_peak()
+                self._open_spans += 1
+            start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            record = {
+                "name": name,
+                "thread": threading.current_thread().name,
+                "tid": threading.get_ident(),
+                "start": start - self._origin,
+                "seconds": seconds,
+            }
+            if memory:
+                current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+                record["allocated_bytes"] = current_bytes - start_bytes
+                record["peak_bytes"] = max(peak_bytes - start_bytes, 0)
+                with self._lock:
+                    self._open_spans -= 1
+            self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+    # calls, total, mean and longest time and largest peak per stage, slowest total first
+    def summary(self):
+        stages = {}
+        for record in list(self.records):
+            stage = stages.setdefault(record["name"], {"name": record["name"], "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "peak_bytes": None})
+            stage["calls"] += 1
+            stage["total_seconds"] += record["seconds"]
+            stage["max_seconds"] = max(stage["max_seconds"], record["seconds"])
+            if "peak_bytes" in record:
+                stage["peak_bytes"] = max(stage["peak_bytes"] or 0, record["peak_bytes"])
+        for stage in stages.values():
+            stage["mean_seconds"] = stage["total_seconds"] / stage["calls"]
+        return sorted(stages.values(), key=lambda stage: stage["total_seconds"], reverse=True)
+
+    def to_json(self):
+        return {"summary": self.summary(), "spans": list(self.records)}
+
+    # complete events of the chrome trace event format, opened by chrome://tracing or perfetto
+    def to_chrome_trace(self):
+        events = []
+        for record in list(self.records):
+            args = {key: record[key] for key in ("allocated_bytes", "peak_bytes") if key in record}
+            events.append({
+                "name": record["name"],
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["seconds"] * 1e6,
+                "pid": os.getpid(),
+                "tid": record["tid"],
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_json(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as output_file:
+            json.dump(self.to_json(), output_file, indent=1)
+
+    def write_chrome_trace(self, file_path):
+        with open(file_path, 'w', encoding='utf-8') as output_file:
+            json.dump(self.to_chrome_trace(), output_file)
+
+
+_NOT_RECORDING = contextlib.nullcontext()
+
+# the profiler used by the gui, switched on by DATA_ANALYSIS_PROFILE or the diagnostics settings tab
+profiler = Profiler.from_environment()
@@ -0,0 +1,170 @@
+import numpy as np
+
+from data_analysis.stats import Z_BANDS
+
+MAX_MODES_SHOWN = 10 # when every value is a mode, listing them all would flood the output
+MAX_TABLE_ROWS_SHOWN = 200 # rows of a statistics table printed, the whole table can be exported
+MAX_INVALID_SHOWN = 5 # invalid input tokens listed by position, the rest are only counted
+
+
+def format_number(number, decimal_places):
+    return f"{number:.{decimal_places}f}"
+
+
+# error guarantee printed next to approximate quantiles
+def format_quantile_error(summary):
+    if not summary.quantile_error:
+        return ""
+    return " (approx., rank error within ±{:.2g}%)".format(summary.quantile_error * 100)
+
+
+# the text report printed by the analyse button and the command line
+def format_report(summary, decimal_places):
+    lines = [
+        "Values count: " + format_number(summary.count, decimal_places),
+        "Sum of values: " + format_number(summary.total, decimal_places),
+        "Highest value: " + format_number(summary.maximum, decimal_places),
+        "Lowest value: " + format_number(summary.minimum, decimal_places),
+        "Mean: " + format_number(summary.mean, decimal_places),
+        "Median: " + format_number(summary.median, decimal_places) + format_quantile_error(summary),
+    ]
+
+    # print mode/s, only listing the first few when many values share the highest count
+    modes = [format_number(mode, decimal_places) for mode in summary.modes[:MAX_MODES_SHOWN]]
+    if len(summary.modes) > MAX_MODES_SHOWN:
+        modes.append("... ({} more)".format(len(summary.modes) - MAX_MODES_SHOWN))
+    if len(summary.modes) > 1:
+        lines.append("Modes: " + ", ".join(modes))
+    elif modes:
+        lines.append("Mode: " + modes[0])
+    else:
+        lines.append("Mode: not tracked with approximate quantiles")
+
+    lines.append("Range: " + format_number(summary.range, decimal_places))
+    lines.append("Standard Deviation: " + format_number(summary.std, decimal_places))
+
+    # quartiles and IQR
+    lines.append("First Quartile (Q1): " + format_number(summary.q1, decimal_places) + format_quantile_error(summary))
+    lines.append("Third Quartile (Q3): " + format_number(summary.q3, decimal_places) + format_quantile_error(summary))
+    lines.append("IQR: " + format_number(summary.iqr, decimal_places) + format_quantile_error(summary))
+    lines.append("")
+
+    # z score statistics
+    for width, fraction in zip(Z_BANDS, summary.z_bands):
+        unit = "standard deviation" if width == 1 else "standard deviations"
+        lines.append("{}% of values are within {:g} {} of the mean".format(format_number(fraction * 100, decimal_places), width, unit))
+    if summary.quantile_error:
+        lines.append("(band percentages are approximate, within ±{:.2g} percentage points)".format(2 * summary.quantile_error * 100))
+    return "\n".join(lines) + "\n\n"
+
+
+# one line per query value of a z-score lookup, noting values that are not in the dataset
+def format_lookup(lookup, decimal_places):
+    lines = []
+    for value, count, rank, percentile, z_score in zip(lookup.values, lookup.counts, lookup.ranks, lookup.percentiles, lookup.z_scores):
+        # the searched value is printed as typed, only the computed numbers are rounded
+        line = "Z-score of {}: {}".format(float(value), format_number(z_score, decimal_places))
+        if count:
+            line += " (found {} time{}, rank {}, percentile {})".format(count, "" if count == 1 else "s", rank, format_number(percentile, decimal_places))
+        else:
+            line += " (not found in your dataset, percentile {})".format(format_number(percentile, decimal_places))
+        lines.append(line)
+    missing = len(lookup.values) - int(np.count_nonzero(lookup.present))
+    if missing:
+        lines.append("Note: {} of {} values were not found in your dataset and their Z-scores may not be applicable.".format(missing, len(lookup.values)))
+    return "\n".join(lines) + "\n\n"
+
+
+# where the invalid tokens of typed input are, as line and column numbers of the input text
+def format_invalid_tokens(numbers_input, invalid_tokens):
+    lines = ["Invalid input/s found: {} token{} could not be read as numbers.".format(len(invalid_tokens), "" if len(invalid_tokens) == 1 else "s")]
+    for start, token in invalid_tokens[:MAX_INVALID_SHOWN]:
+        line = numbers_input.count("\n", 0, start) + 1
+        column = start - (numbers_input.rfind("\n", 0, start) + 1) + 1
+        lines.append("  '{}' at line {}, column {}".format(token, line, column))
+    if len(invalid_tokens) > MAX_INVALID_SHOWN:
+        lines.append("  ... ({} more)".format(len(invalid_tokens) - MAX_INVALID_SHOWN))
+    return "\n".join(lines) + "\n"
+
+
+# one row per column of a loaded file, the selected column marked with *. columns without numbers are listed too
+def format_columns_table(names, summaries, selected, decimal_places):
+    rows = [["Column", "Count", "Mean", "Std", "Min", "Q1", "Median", "Q3", "Max"]]
+    for index, (name, summary) in enumerate(zip(names, summaries)):
+        name = ("* " if index == selected else "  ") + name
+        if summary is None:
+            rows.append([name, "0"] + ["-"] * 7)
+            continue
+        statistics = [summary.mean, summary.std, summary.minimum, summary.q1, summary.median, summary.q3, summary.maximum]
+        rows.append([name, str(summary.count)] + [format_number(number, decimal_places) for number in statistics])
+    return align_rows(rows)
+
+
+# rows of text cells as fixed width lines, the first column left aligned and the rest right aligned
+def align_rows(rows):
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    lines = ["  ".join(cell.ljust(width) if column == 0 else cell.rjust(width) for column, (cell, width) in enumerate(zip(row, widths))) for row in rows]
+    return "\n".join(lines) + "\n"
+
+
+# the first limit rows of a table of named columns (e.g. group statistics), counts printed as whole numbers
+def format_stats_table(columns, decimal_places, limit=MAX_TABLE_ROWS_SHOWN):
+    names = list(columns)
+    total_rows = len(columns[names[0]])
+    rows = [names]
+    for index in range(min(total_rows, limit)):
+        rows.append([
+            str(int(columns[name][index])) if np.asarray(columns[name]).dtype.kind in 'iu' else format_number(columns[name][index], decimal_places)
+            for name in names
+        ])
+    text = align_rows(rows)
+    if total_rows > limit:
+        text += "... ({} more rows, export the table to see them all)\n".format(total_rows - limit)
+    return text
+
+
+# the per-stage summary of a profiler, slowest total first
+def format_profile(stages):
+    if not stages:
+        return "No timings recorded yet.\n"
+    rows = [["Stage", "Calls", "Total ms", "Mean ms", "Max ms", "Peak MB"]]
+    for stage in stages:
+        peak = "-" if stage["peak_bytes"] is None else "{:.1f}".format(stage["peak_bytes"] / 2 ** 20)
+        rows.append([stage["name"], str(stage["calls"]), "{:.1f}".format(stage["total_seconds"] * 1000),
+                     "{:.1f}".format(stage["mean_seconds"] * 1000), "{:.1f}".format(stage["max_seconds"] * 1000), peak])
+    return align_rows(rows)
+
+
+# counters of a live ingest, printed above its statistics
+def format_live_status(ingest):
+    state = "stopped" if not ingest.running else "receiving"
+    lines = ["Live from {} ({}): {} values received, {:.0f} per second".format(ingest.name, state, ingest.received, ingest.rate),
+             "Queue: {} of {} batches waiting, at most {} (backpressure), {} values dropped while it was full".format(
+                 ingest.backlog, ingest.batches.maxsize, ingest.peak_backlog, ingest.dropped)]
+    if ingest.invalid:
+        lines.append("{} tokens were not numbers and were skipped".format(ingest.invalid))
+    if ingest.error:
+        lines.append("Error: {}".format(ingest.error))
+    return "\n".join(lines) + "\n\n"
+
+
+# one row per fitted distribution, best first, with its estimates and goodness of fit statistics
+def format_fits(fits, decimal_places):
+    if not fits:
+        return "At least two different finite values are needed to fit distributions.\n"
+    rows = [["Distribution", "Parameters", "KS", "AD"]]
+    for fit in fits:
+        parameters = ", ".join("{}={}".format(name, format_number(value, decimal_places)) for name, value in fit.parameters.items())
+        rows.append([fit.name, parameters, "{:.4f}".format(fit.ks), "{:.4g}".format(fit.ad)])
+    return "Distribution fits, best first (KS: largest cdf gap, AD: Anderson-Darling, lower is better):\n" + align_rows(rows)
+
+
+# what a cleaning removed, printed above the statistics of the values it kept
+def format_cleaning(cleaning, decimal_places):
+    lines = ["Outliers removed by {} (threshold {:g}): {} of {} values".format(cleaning.method, cleaning.threshold, cleaning.flagged, cleaning.count)]
+    if cleaning.kept:
+        lines[0] += " outside [{}, {}]".format(format_number(cleaning.low, decimal_places), format_number(cleaning.high, decimal_places))
+    if cleaning.non_finite:
+        lines.append("{} nan or infinite values left out".format(cleaning.non_finite))
+    lines.append("Statistics of the {} remaining values:".format(cleaning.kept) if cleaning.kept else "No values remain after cleaning.")
+    return "\n".join(lines) + "\n\n"
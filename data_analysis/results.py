@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+from data_analysis.cleaning import clean_sorted, kept_mask
+from data_analysis.lookup import ValueIndex
+from data_analysis.plotting import decimate_minmax, density_grid
+
+
+# results of a Dataset shared by the report, plots and z-score lookups.
+# values is a snapshot of the dataset taken at the last update, and version the dataset version it was
+# taken at: a changed version drops everything derived from the old values. derived arrays are computed
+# once on first use (usually on a worker thread) and kept until then. results that also use the summary
+# (e.g. z-scores and box plot statistics) are kept apart and dropped whenever the summary changes, as it
+# does when the quantile mode is switched without the values changing
+class AnalysisCache:
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.version = None
+        self.values = None
+        self.summary = None
+        self._derived = {}
+        self._from_summary = {}
+        self._lock = threading.Lock()
+
+    # new analysis results of the dataset; derived arrays survive while its version is unchanged
+    def update(self, summary, sorted_values=None):
+        with self._lock:
+            if self.dataset.version != self.version:
+                self.version = self.dataset.version
+                self.values = self.dataset.view()
+                self._derived = {}
+                self._from_summary = {}
+            if summary is not self.summary:
+                self._from_summary = {}
+            self.summary = summary
+            if sorted_values is not None:
+                self._derived['sorted'] = sorted_values
+
+    def clear(self):
+        with self._lock:
+            self.version = None
+            self.values = None
+            self.summary = None
+            self._derived = {}
+            self._from_summary = {}
+
+    # memoised compute(values) for the current version, not stored if the dataset changed meanwhile.
+    # with from_summary it is compute(values, summary), kept for the current summary only
+    def get(self, key, compute, from_summary=False):
+        with self._lock:
+            derived = self._from_summary if from_summary else self._derived
+            if key in derived:
+                return derived[key]
+            version, values, summary = self.version, self.values, self.summary
+        result = compute(values, summary) if from_summary else compute(values)
+        with self._lock:
+            if version == self.version and (not from_summary or summary is self.summary):
+                derived[key] = result
+        return result
+
+    def sorted_values(self):
+        return self.get('sorted', np.sort)
+
+    def z_scores(self):
+        return self.get('z_scores', lambda values, summary: (values - summary.mean) / summary.std, from_summary=True)
+
+    def histogram(self, bins=30, density=False):
+        return self.get(('histogram', bins, density), lambda values: np.histogram(values, bins=bins, density=density))
+
+    def decimated_line(self):
+        return self.get('decimated_line', decimate_minmax)
+
+    def density_grid(self):
+        return self.get('density_grid', lambda values: density_grid(np.arange(len(values)), values))
+
+    # sorted-array index answering presence, counts, ranks, percentiles and z-scores of query values
+    def value_index(self):
+        return self.get('value_index', lambda values, summary: ValueIndex(self.sorted_values(), summary.mean, summary.std), from_summary=True)
+
+    # outlier cleaning of the sorted values, kept per method and threshold so switching it off and on
+    # again costs nothing; the kept values are a slice of the sorted array
+    def cleaned(self, method, threshold):
+        return self.get(('cleaned', method, threshold), lambda values: clean_sorted(self.sorted_values(), method, threshold))
+
+    # True for the values kept by a cleaning, in the order of the dataset, for highlighting the rest
+    def kept_mask(self, method, threshold):
+        cleaning = self.cleaned(method, threshold)
+        return self.get(('kept_mask', method, threshold), lambda values: kept_mask(values, cleaning.low, cleaning.high))
+
+    # candidate distributions fitted to the sorted values, best first. scipy is imported on first use,
+    # so the app starts without it
+    def distribution_fits(self, progress=None):
+        from data_analysis.fitting import fit_distributions
+        return self.get('distribution_fits', lambda values: fit_distributions(self.sorted_values(), progress))
+
+    # the distribution fits if they have already been worked out, None otherwise; never fits anything
+    def fitted_distributions(self):
+        with self._lock:
+            return self._derived.get('distribution_fits')
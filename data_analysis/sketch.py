@@ -0,0 +1,106 @@
+import math
+import random
+
+import numpy as np
+
+DEFAULT_SKETCH_SIZE = 200 # items kept in the top compactor, larger is more accurate
+RANK_ERROR_FACTOR = 3.3 # rank error stays within RANK_ERROR_FACTOR / k of the count with ~99% confidence
+
+
+# sketch size needed to keep the normalised rank error within error (e.g. 0.01 for 1%)
+def sketch_size_for_error(error):
+    if not 0 < error < 1:
+        raise ValueError("Rank error must be between 0 and 1")
+    return max(8, int(math.ceil(RANK_ERROR_FACTOR / error)))
+
+
+# mergeable KLL-style quantile sketch. values are kept in levels of compactors, an item at
+# level h standing for 2**h original values; a full level is sorted and every other item is
+# promoted, so memory stays around 3k items whatever the number of values seen
+class QuantileSketch:
+    def __init__(self, k=DEFAULT_SKETCH_SIZE):
+        self.k = k
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._levels = [np.empty(0)]
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def for_error(cls, error):
+        return cls(sketch_size_for_error(error))
+
+    # guaranteed normalised rank error of quantile answers, 0 while nothing has been compacted yet
+    @property
+    def rank_error(self):
+        return RANK_ERROR_FACTOR / self.k if len(self._levels) > 1 else 0.0
+
+    # capacity shrinks geometrically towards the lower levels
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                kept = items[:len(items) % 2] # an odd item out stays at this level
+                promoted = items[len(kept) + random.getrandbits(1)::2]
+                self._levels[level] = kept
+                self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+                level = 0 # capacities change when a level is added
+                continue
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._levels[0] = np.concatenate((self._levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate((self._levels[level], items))
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+
+    def copy(self):
+        duplicate = QuantileSketch(self.k)
+        duplicate.count, duplicate.minimum, duplicate.maximum = self.count, self.minimum, self.maximum
+        duplicate._levels = list(self._levels) # level arrays are replaced, never changed in place
+        return duplicate
+
+    # retained items in value order with the cumulative weight up to and including each one
+    def _weighted(self):
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self._levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    # estimated number of values below x (or at most x with side='right'), vectorized over x
+    def rank(self, x, side='right'):
+        items, cumulative = self._weighted()
+        positions = np.searchsorted(items, x, side=side)
+        ranks = np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0)
+        return ranks * self.count / cumulative[-1]
+
+    # estimated q-th percentile, pinned to the exact minimum and maximum at the ends
+    def percentile(self, q):
+        items, cumulative = self._weighted()
+        target = (self.count - 1) * q / 100
+        position = min(int(np.searchsorted(cumulative * self.count / cumulative[-1], target, side='right')), len(items) - 1)
+        return float(min(max(items[position], self.minimum), self.maximum))
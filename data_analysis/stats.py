@@ -0,0 +1,198 @@
+import math
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+# widths (in standard deviations) reported in the z-score band summary
+Z_BANDS = (0.25, 0.5, 1, 2, 3)
+SIGN_MASK = 0x7FFFFFFFFFFFFFFF
+
+
+# everything get_input reports, computed in one go so the gui only has to render it
+@dataclass
+class Summary:
+    count: int
+    total: float
+    minimum: float
+    maximum: float
+    mean: float
+    std: float
+    median: float
+    q1: float
+    q3: float
+    modes: np.ndarray
+    mode_count: int
+    z_bands: tuple # fraction of values within each Z_BANDS width of the mean
+    quantile_error: float = 0.0 # normalised rank error of median, q1 and q3, 0 when they are exact
+
+    @property
+    def range(self):
+        return self.maximum - self.minimum
+
+    @property
+    def iqr(self):
+        return self.q3 - self.q1
+
+    # plain python values, ready for json
+    def to_dict(self):
+        result = asdict(self)
+        result['modes'] = self.modes.tolist()
+        result['z_bands'] = {str(width): fraction for width, fraction in zip(Z_BANDS, self.z_bands)}
+        result['range'] = self.range
+        result['iqr'] = self.iqr
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+        fields = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        fields['modes'] = np.asarray(data['modes'], dtype=np.float64)
+        fields['z_bands'] = tuple(data['z_bands'][str(width)] for width in Z_BANDS)
+        return cls(**fields)
+
+
+# linear-interpolated percentile of an already sorted array, same method as np.percentile
+def sorted_percentile(sorted_values, q):
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower))
+
+
+# integer with the same order as the float64 x, so binary search over values can step through every float
+def order_key(x):
+    bits = int(np.array([x], dtype=np.float64).view(np.int64)[0])
+    return bits ^ ((bits >> 63) & SIGN_MASK)
+
+
+def from_order_key(key):
+    bits = key ^ ((key >> 63) & SIGN_MASK)
+    return float(np.array([bits], dtype=np.int64).view(np.float64)[0])
+
+
+# the value at 0-based position rank of values kept in several sorted pieces, found by bisecting the float
+# order between minimum and maximum. count_at_most(x) is the number of values at most x
+def select_rank(count_at_most, rank, minimum, maximum):
+    low, high = order_key(minimum), order_key(maximum)
+    while low < high:
+        middle = (low + high) // 2
+        if count_at_most(from_order_key(middle)) > rank:
+            high = middle
+        else:
+            low = middle + 1
+    return from_order_key(low)
+
+
+# linear-interpolated percentile of values kept in several sorted pieces, same method as sorted_percentile
+def select_percentile(count_at_most, q, count, minimum, maximum):
+    position = (count - 1) * q / 100
+    lower = int(position)
+    lower_value = select_rank(count_at_most, lower, minimum, maximum)
+    upper_value = select_rank(count_at_most, min(lower + 1, count - 1), minimum, maximum)
+    return lower_value + (upper_value - lower_value) * (position - lower)
+
+
+# every value sharing the highest count, read off the run lengths of a sorted array
+def sorted_modes(sorted_values):
+    run_starts = np.empty(len(sorted_values), dtype=bool)
+    run_starts[0] = True
+    np.not_equal(sorted_values[1:], sorted_values[:-1], out=run_starts[1:])
+    starts = np.flatnonzero(run_starts)
+    counts = np.diff(starts, append=len(sorted_values))
+    mode_count = int(counts.max())
+    return sorted_values[starts[counts == mode_count]], mode_count
+
+
+# fraction of values within each band of the mean, counted by binary search on the sorted array
+def sorted_z_bands(sorted_values, mean, std):
+    if std == 0:
+        return tuple(1.0 for _ in Z_BANDS)
+    widths = np.asarray(Z_BANDS) * std
+    inside = np.searchsorted(sorted_values, mean + widths, side='right') - np.searchsorted(sorted_values, mean - widths, side='left')
+    return tuple(float(x) for x in inside / len(sorted_values))
+
+
+# analyse an already sorted float array without copying it
+def summarise_sorted(sorted_values):
+    if len(sorted_values) == 0:
+        raise ValueError("No values to analyse")
+    count = len(sorted_values)
+    total = float(sorted_values.sum())
+    mean = total / count
+    std = float(np.sqrt(np.mean(np.square(sorted_values - mean))))
+    modes, mode_count = sorted_modes(sorted_values)
+    return Summary(
+        count=count,
+        total=total,
+        minimum=float(sorted_values[0]),
+        maximum=float(sorted_values[-1]),
+        mean=mean,
+        std=std,
+        median=sorted_percentile(sorted_values, 50),
+        q1=sorted_percentile(sorted_values, 25),
+        q3=sorted_percentile(sorted_values, 75),
+        modes=modes,
+        mode_count=mode_count,
+        z_bands=sorted_z_bands(sorted_values, mean, std),
+    )
+
+
+# load values into one float64 array, sort it once and derive every statistic from it
+def summarise(values):
+    return summarise_sorted(np.sort(np.asarray(values, dtype=np.float64).ravel()))
+
+
+# summaries of every column of a column-major float64 matrix, nan cells are left out.
+# each column is contiguous, so it is sorted and summarised in place of a whole-matrix pass per statistic;
+# columns without any values get None
+def summarise_columns(matrix):
+    summaries = []
+    for column in np.asarray(matrix, dtype=np.float64).T:
+        sorted_values = np.sort(column)
+        count = int(np.searchsorted(sorted_values, np.nan)) # nan sorts last, the values come before it
+        summaries.append(summarise_sorted(sorted_values[:count]) if count else None)
+    return summaries
+
+
+# calculate mean of list
+def calculate_mean(numbers):
+    total = sum(numbers)
+    count = len(numbers)
+    mean = total / count
+    return mean
+
+
+# calculate median of list
+def calculate_median(numbers):
+    sorted_numbers = sorted(numbers)
+    length = len(sorted_numbers)
+
+    if length % 2 == 1:
+        median = sorted_numbers[length // 2]
+    else:
+        middle_right = length // 2
+        middle_left = middle_right - 1
+        median = (sorted_numbers[middle_left] + sorted_numbers[middle_right]) / 2
+    return median
+
+
+# calculate range of list
+def calculate_range(numbers):
+    list_range = max(numbers) - min(numbers)
+    return list_range
+
+
+# calculate standard deviation of list
+def calculate_standard_deviation(numbers):
+    mean = calculate_mean(numbers)
+    squared_diff_sum = sum((x - mean) ** 2 for x in numbers)
+    variance = squared_diff_sum / len(numbers)
+    standard_deviation = math.sqrt(variance)
+    return standard_deviation
+
+
+# calculate z scores
+def calculate_z_scores(numbers):
+    mean = calculate_mean(numbers)
+    std = calculate_standard_deviation(numbers)
+    z_scores = [(x - mean) / std for x in numbers]
+    return z_scores
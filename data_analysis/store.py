@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from data_analysis.columns import ColumnTable, read_csv_table
+from data_analysis.loader import CHUNK_SIZE
+from data_analysis.stats import Summary, summarise, summarise_columns
+
+STORE_VERSION = 4 # bump when the sidecar layout or the summary fields change
+
+
+# binary copy and summary sidecar kept next to a source file, e.g. data.csv.npy and data.csv.summary.json
+def store_paths(source_path):
+    return source_path + ".npy", source_path + ".summary.json"
+
+
+def file_hash(file_path):
+    hasher = hashlib.blake2b()
+    with open(file_path, 'rb') as source:
+        for block in iter(lambda: source.read(CHUNK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _read_sidecar(sidecar_path):
+    try:
+        with open(sidecar_path, encoding='utf-8') as sidecar:
+            data = json.load(sidecar)
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == STORE_VERSION else None
+
+
+def _write_sidecar(sidecar_path, data):
+    temporary_path = sidecar_path + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as sidecar:
+        json.dump(data, sidecar)
+    os.replace(temporary_path, sidecar_path)
+
+
+# memory-mapped columns, cached column summaries and sidecar data of a source file, or None when there is
+# no valid copy.
+# a changed mtime alone only costs a re-hash: the copy is kept if the content is the same
+def load_stored(source_path):
+    binary_path, sidecar_path = store_paths(source_path)
+    data = _read_sidecar(sidecar_path)
+    if data is None or not os.path.exists(binary_path):
+        return None
+
+    source_stat = os.stat(source_path)
+    recorded = data["source"]
+    if source_stat.st_size != recorded["size"]:
+        return None
+    if source_stat.st_mtime_ns != recorded["mtime_ns"]:
+        if file_hash(source_path) != recorded["hash"]:
+            return None
+        recorded["mtime_ns"] = source_stat.st_mtime_ns
+        try:
+            _write_sidecar(sidecar_path, data)
+        except OSError:
+            pass
+
+    matrix = np.load(binary_path, mmap_mode='r')
+    if matrix.ndim != 2 or matrix.shape != (data["rows"], len(data["columns"])):
+        return None
+    return ColumnTable.from_matrix(data["columns"], matrix, data["dtypes"]), _summaries_from_dicts(data["summaries"]), data
+
+
+def _summaries_from_dicts(summaries):
+    return [Summary.from_dict(summary) if summary else None for summary in summaries]
+
+
+# write the column-major copy of the cells and the summary sidecar for a source file
+def save_stored(source_path, source_stat, content_hash, table, summaries):
+    binary_path, sidecar_path = store_paths(source_path)
+    temporary_path = binary_path + ".tmp"
+    with open(temporary_path, 'wb') as binary:
+        np.save(binary, table.cells())
+    os.replace(temporary_path, binary_path)
+    _write_sidecar(sidecar_path, {
+        "version": STORE_VERSION,
+        "source": {"size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns, "hash": content_hash},
+        "rows": len(table),
+        "columns": table.names,
+        "dtypes": [column.dtype.name for column in table.columns],
+        "summaries": [summary.to_dict() if summary else None for summary in summaries],
+    })
+
+
+# columns and column summaries of a csv file, from its binary copy when that is still valid.
+# returns (table, summaries, from_store); the copy is (re)written after a fresh parse when possible
+def load_table(source_path, progress=None):
+    stored = load_stored(source_path)
+    if stored:
+        return stored[0], stored[1], True
+
+    source_stat = os.stat(source_path)
+    hasher = hashlib.blake2b()
+    table = read_csv_table(source_path, progress=progress, hasher=hasher)
+    summaries = summarise_columns(table.matrix())
+    if any(summaries):
+        try:
+            save_stored(source_path, source_stat, hasher.hexdigest(), table, summaries)
+        except OSError:
+            pass # read-only location, the file is simply parsed again next time
+    return table, summaries, False
+
+
+# the columns of a csv file with the summary over every numeric cell, as used for whole-file results.
+# returns (table, summary, from_store); with a single column this is that column's cached summary,
+# otherwise the summary over all columns is worked out once and added to the sidecar. the cells are only
+# gathered into one array for that, so a file with a cached summary is never read into memory
+def load_dataset(source_path, progress=None):
+    stored = load_stored(source_path)
+    table, summaries, from_store = (stored[0], stored[1], True) if stored else load_table(source_path, progress)
+    if len(table.columns) <= 1 or not any(summaries):
+        return table, summaries[0] if summaries else None, from_store
+
+    data = stored[2] if stored else _read_sidecar(store_paths(source_path)[1])
+    if data and data.get("summary"):
+        return table, Summary.from_dict(data["summary"]), from_store
+    summary = summarise(np.concatenate([table.values(index) for index in range(len(table.columns))]))
+    if data:
+        data["summary"] = summary.to_dict()
+        try:
+            _write_sidecar(store_paths(source_path)[1], data)
+        except OSError:
+            pass
+    return table, summary, from_store
+
+
+# open a binary dataset directly: a one-dimensional array is a single column, a two-dimensional one has a
+# column per column. the names and summaries of the source it was made from are used when they match
+def open_binary(binary_path):
+    matrix = np.load(binary_path, mmap_mode='r')
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(-1, 1)
+    if matrix.ndim != 2:
+        raise ValueError("Expected a one or two-dimensional array of values")
+    data = None
+    if binary_path.endswith(".npy"):
+        data = _read_sidecar(binary_path[:-len(".npy")] + ".summary.json")
+    if data and matrix.dtype == np.float64 and matrix.shape == (data["rows"], len(data["columns"])):
+        return ColumnTable.from_matrix(data["columns"], matrix, data["dtypes"]), _summaries_from_dicts(data["summaries"])
+    names = ["column {}".format(index + 1) for index in range(matrix.shape[1])]
+    return ColumnTable.from_matrix(names, matrix), summarise_columns(matrix)
@@ -0,0 +1,45 @@
+import csv
+import os
+import zipfile
+
+import numpy as np
+
+
+def _write_csv(file_path, columns):
+    with open(file_path, 'w', newline='', encoding='utf-8') as table_file:
+        writer = csv.writer(table_file)
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
+
+
+# one .npy array per column in a zip archive, the layout np.load reads back as an npz file
+def _write_npz(file_path, columns):
+    with zipfile.ZipFile(file_path, 'w') as archive:
+        for name, values in columns.items():
+            with archive.open(name + ".npy", 'w') as member:
+                np.lib.format.write_array(member, np.asarray(values))
+
+
+def _write_parquet(file_path, columns):
+    import pyarrow
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(pyarrow.table({name: list(values) for name, values in columns.items()}), file_path)
+
+
+# pick the writer for a table path up front, so a missing optional dependency fails before any work is done
+def table_writer(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".npz":
+        return _write_npz
+    if extension == ".parquet":
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Writing parquet files needs pyarrow, use a .csv or .npz table instead") from None
+        return _write_parquet
+    return _write_csv
+
+
+# write named columns of equal length as csv, npz (one array per column) or parquet
+def write_table(file_path, columns):
+    table_writer(file_path)(file_path, columns)
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+POLL_INTERVAL = 50 # milliseconds between checks for a finished task
+
+
+# raised inside a task once it has been cancelled, so it stops at the next check
+class Cancelled(Exception):
+    pass
+
+
+# shared between a running task and the gui: cancellation flag plus the latest progress report
+class TaskState:
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self.progress = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    # called from the worker, read back on the gui thread by the next poll
+    def report(self, done, total):
+        self.check()
+        self.progress = (done, total)
+
+
+# runs one job at a time on a worker thread and hands its result back through the gui's event loop.
+# schedule is tkinter's after(ms, func, *args), so callbacks only ever run on the gui thread.
+# submitting a new job cancels the current one: a job that hasn't started yet never runs, a running one
+# stops at its next check, and results of superseded jobs are dropped.
+class TaskRunner:
+    def __init__(self, schedule, on_busy=None, poll_interval=POLL_INTERVAL):
+        self._schedule = schedule
+        self._on_busy = on_busy
+        self._poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._generation = 0
+        self._state = None
+        self._future = None
+        self._kind = None
+
+    @property
+    def busy(self):
+        return self._state is not None
+
+    # what the current job is, as given to submit, None when there is no job
+    @property
+    def kind(self):
+        return self._kind
+
+    # job is called as job(*args, state) on the worker thread
+    def submit(self, job, *args, kind=None, on_done=None, on_error=None, on_progress=None):
+        self.cancel()
+        self._generation += 1
+        self._state = TaskState()
+        self._kind = kind
+        future = self._future = self._executor.submit(job, *args, self._state)
+        if self._on_busy:
+            self._on_busy(True)
+        self._schedule(self._poll_interval, self._poll, self._generation, self._state, future, on_done, on_error, on_progress)
+
+    def cancel(self):
+        if self._state is None:
+            return
+        self._state.cancel()
+        self._future.cancel() # still queued behind the running job, so it is dropped without running
+        self._finish()
+
+    def _finish(self):
+        self._generation += 1 # any poll still scheduled for the old job now ignores it
+        self._state = None
+        self._future = None
+        self._kind = None
+        if self._on_busy:
+            self._on_busy(False)
+
+    def _poll(self, generation, state, future, on_done, on_error, on_progress):
+        if generation != self._generation:
+            return
+        if on_progress and state.progress:
+            on_progress(*state.progress)
+        if not future.done():
+            self._schedule(self._poll_interval, self._poll, generation, state, future, on_done, on_error, on_progress)
+            return
+
+        self._finish()
+        try:
+            result = future.result()
+        except (Cancelled, CancelledError):
+            return
+        except Exception as error:
+            if on_error is None:
+                raise
+            on_error(error)
+        else:
+            if on_done:
+                on_done(result)
@@ -0,0 +1,59 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from data_analysis.external import MIN_MEMORY_BUDGET, summarise_out_of_core
+from data_analysis.loader import read_csv_values
+from data_analysis.stats import summarise
+
+
+class OutOfCoreTest(unittest.TestCase):
+    # a file many times the smallest budget's chunk, so the values are spread over several runs and buckets,
+    # with repeated values, a blank line, a header and a non-numeric cell
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.file_path = os.path.join(cls.directory.name, "values.csv")
+        rng = np.random.default_rng(0)
+        values = np.round(rng.normal(size=(150_000, 2)) * 100, 1)
+        with open(cls.file_path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write("\na,b\n1.5,x\n")
+            np.savetxt(csv_file, values, fmt="%.1f", delimiter=",")
+        cls.expected = summarise(read_csv_values(cls.file_path))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_exact_matches_in_memory(self):
+        summary = summarise_out_of_core(self.file_path, MIN_MEMORY_BUDGET, spill_dir=self.directory.name)
+        for field in ("count", "minimum", "maximum", "median", "q1", "q3", "mode_count", "quantile_error"):
+            self.assertEqual(getattr(summary, field), getattr(self.expected, field), field)
+        for field in ("total", "mean", "std"):
+            self.assertAlmostEqual(getattr(summary, field), getattr(self.expected, field), places=6, msg=field)
+        np.testing.assert_array_equal(summary.modes, self.expected.modes)
+        np.testing.assert_allclose(summary.z_bands, self.expected.z_bands, atol=1 / self.expected.count)
+
+    def test_approx_within_rank_error(self):
+        random.seed(0)
+        summary = summarise_out_of_core(self.file_path, MIN_MEMORY_BUDGET, quantile_error=0.01, spill_dir=self.directory.name)
+        sorted_values = np.sort(read_csv_values(self.file_path))
+        self.assertEqual(summary.count, self.expected.count)
+        self.assertEqual(summary.mode_count, self.expected.mode_count)
+        self.assertGreater(summary.quantile_error, 0)
+        for field, q in (("q1", 25), ("median", 50), ("q3", 75)):
+            target = (len(sorted_values) - 1) * q / 100
+            value = getattr(summary, field)
+            below, at_most = np.searchsorted(sorted_values, value, side='left'), np.searchsorted(sorted_values, value, side='right')
+            self.assertLessEqual(max(below - target, target - at_most, 0) / len(sorted_values), summary.quantile_error, field)
+
+    def test_spill_files_are_removed(self):
+        summarise_out_of_core(self.file_path, MIN_MEMORY_BUDGET, spill_dir=self.directory.name)
+        self.assertEqual(os.listdir(self.directory.name), ["values.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
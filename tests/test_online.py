@@ -0,0 +1,101 @@
+import random
+import unittest
+
+import numpy as np
+
+from data_analysis.online import RunningStats
+from data_analysis.sketch import QuantileSketch
+from data_analysis.stats import summarise
+
+
+class RunningStatsTest(unittest.TestCase):
+    def assertSummaryEqual(self, summary, expected):
+        for field in ("count", "minimum", "maximum", "median", "q1", "q3", "mode_count"):
+            self.assertEqual(getattr(summary, field), getattr(expected, field), field)
+        for field in ("total", "mean", "std"):
+            self.assertAlmostEqual(getattr(summary, field), getattr(expected, field), places=9, msg=field)
+        np.testing.assert_array_equal(summary.modes, expected.modes)
+        np.testing.assert_allclose(summary.z_bands, expected.z_bands, atol=1 / expected.count)
+
+    # batches of continuous values (every value a mode) and of rounded ones with repeats
+    def batches(self, seed):
+        rng = np.random.default_rng(seed)
+        return [rng.normal(size=int(rng.integers(1, 500))) if index % 2 else np.round(rng.normal(size=int(rng.integers(1, 500))), 1)
+                for index in range(20)]
+
+    def test_update_matches_summarise(self):
+        for seed in range(5):
+            running = RunningStats()
+            seen = []
+            for batch in self.batches(seed):
+                running.update(batch)
+                seen.append(batch)
+                self.assertSummaryEqual(running.summary(), summarise(np.concatenate(seen)))
+
+    def test_update_after_from_sorted_matches_summarise(self):
+        for seed in range(5):
+            batches = self.batches(seed)
+            first = np.sort(batches[0])
+            running = RunningStats.from_sorted(first, summarise(first))
+            for index, batch in enumerate(batches[1:], 2):
+                running.update(batch)
+                self.assertSummaryEqual(running.summary(), summarise(np.concatenate(batches[:index])))
+
+    def test_merge_matches_summarise(self):
+        for seed in range(5):
+            batches = self.batches(seed)
+            merged = RunningStats()
+            for index, batch in enumerate(batches, 1):
+                other = RunningStats.from_sorted(np.sort(batch)) if index % 3 else RunningStats()
+                if not index % 3:
+                    other.update(batch[:len(batch) // 2])
+                    other.update(batch[len(batch) // 2:])
+                merged.merge(other)
+                self.assertSummaryEqual(merged.summary(), summarise(np.concatenate(batches[:index])))
+
+    def test_copy_is_independent(self):
+        running = RunningStats.from_sorted(np.arange(10.0))
+        duplicate = running.copy()
+        duplicate.update([100.0, 100.0])
+        self.assertSummaryEqual(running.summary(), summarise(np.arange(10.0)))
+        self.assertSummaryEqual(duplicate.summary(), summarise(np.concatenate((np.arange(10.0), [100.0, 100.0]))))
+
+
+class QuantileSketchTest(unittest.TestCase):
+    # the normalised rank error of every estimated rank and percentile stays within the sketch's bound
+    def test_rank_error_within_bound(self):
+        random.seed(0)
+        rng = np.random.default_rng(0)
+        for values in (rng.normal(size=200_000), rng.exponential(size=200_000), np.round(rng.normal(size=200_000), 2)):
+            sketch = QuantileSketch.for_error(0.01)
+            for start in range(0, len(values), 7_000):
+                sketch.update(values[start:start + 7_000])
+            self.assertGreater(sketch.rank_error, 0)
+            self.assertLessEqual(sketch.rank_error, 0.01)
+            sorted_values = np.sort(values)
+            probes = np.quantile(values, np.linspace(0, 1, 101))
+            exact = np.searchsorted(sorted_values, probes, side='right')
+            self.assertLessEqual(np.max(np.abs(sketch.rank(probes) - exact)) / len(values), sketch.rank_error)
+            for q in range(0, 101, 5):
+                rank = np.searchsorted(sorted_values, sketch.percentile(q), side='right')
+                low = np.searchsorted(sorted_values, sketch.percentile(q), side='left')
+                target = (len(values) - 1) * q / 100
+                self.assertLessEqual(max(low - target, target - rank, 0) / len(values), sketch.rank_error, q)
+
+    def test_merge_keeps_rank_error_within_bound(self):
+        random.seed(1)
+        rng = np.random.default_rng(1)
+        values = rng.lognormal(size=200_000)
+        merged = QuantileSketch.for_error(0.01)
+        for part in np.array_split(values, 16):
+            sketch = QuantileSketch.for_error(0.01)
+            sketch.update(part)
+            merged.merge(sketch)
+        self.assertEqual(merged.count, len(values))
+        probes = np.quantile(values, np.linspace(0, 1, 101))
+        exact = np.searchsorted(np.sort(values), probes, side='right')
+        self.assertLessEqual(np.max(np.abs(merged.rank(probes) - exact)) / len(values), merged.rank_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import ast
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+HEAVY_MODULES = ("matplotlib", "scipy") # the same list as app.py's, which can't be imported without opening its window
+
+
+# modules app.py imports at the top level, before its window appears
+def eager_imports():
+    with open(APP, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            modules.append(node.module)
+    return modules
+
+
+class StartupTest(unittest.TestCase):
+    def test_eager_imports_leave_out_heavy_modules(self):
+        modules = eager_imports()
+        self.assertIn("data_analysis.results", modules)
+        script = "import sys\n{}\nprint(','.join(name for name in {!r} if name in sys.modules))".format(
+            "\n".join("import " + module for module in modules), HEAVY_MODULES)
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "", "imported before the window appears")
+
+    @unittest.skipIf(sys.platform.startswith("linux") and not os.environ.get("DISPLAY"), "no display to open the window on")
+    def test_first_paint(self):
+        environment = dict(os.environ, DATA_ANALYSIS_STARTUP_CHECK="1", DATA_ANALYSIS_PREWARM="0")
+        result = subprocess.run([sys.executable, APP], cwd=ROOT, env=environment, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
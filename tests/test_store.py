@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from data_analysis.columns import read_csv_table
+from data_analysis.stats import summarise
+from data_analysis.store import load_dataset, load_table, open_binary, store_paths
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_path = os.path.join(self.directory.name, "values.csv")
+        rng = np.random.default_rng(0)
+        with open(self.file_path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write("id,value,score\n")
+            for index, (value, score) in enumerate(zip(rng.normal(size=5000), rng.integers(-50, 50, 5000))):
+                # a few blank and non-numeric cells, and whole numbers beyond float32
+                csv_file.write("{},{},{}\n".format(index + 2 ** 40, "" if index % 97 == 0 else repr(float(value)), "n/a" if index % 89 == 0 else score))
+
+    def assertTablesEqual(self, table, expected):
+        self.assertEqual(table.names, expected.names)
+        for column, expected_column in zip(table.columns, expected.columns):
+            self.assertEqual(column.dtype, expected_column.dtype)
+            np.testing.assert_array_equal(column, expected_column)
+
+    def test_round_trip_matches_parsed_file(self):
+        expected = read_csv_table(self.file_path)
+        self.assertEqual([column.dtype for column in expected.columns], [np.int64, np.float64, np.float64])
+        table, summaries, from_store = load_table(self.file_path)
+        self.assertFalse(from_store)
+        self.assertTrue(all(os.path.exists(path) for path in store_paths(self.file_path)))
+
+        stored, stored_summaries, from_store = load_table(self.file_path)
+        self.assertTrue(from_store)
+        self.assertTablesEqual(stored, expected)
+        for column in stored.columns:
+            self.assertIsInstance(column.base, np.memmap) # a view of the memory-mapped copy, never read in
+        for index, summary in enumerate(stored_summaries):
+            self.assertEqual(summary.to_dict(), summarise(expected.values(index)).to_dict())
+            self.assertEqual(summary.to_dict(), summaries[index].to_dict())
+
+    def test_dataset_summary_matches_every_cell(self):
+        table = read_csv_table(self.file_path)
+        expected = summarise(np.concatenate([table.values(index) for index in range(len(table.columns))]))
+        for from_store in (False, True, True): # parsed, then the summary worked out from the copy, then cached
+            stored, summary, loaded_from_store = load_dataset(self.file_path)
+            self.assertEqual(loaded_from_store, from_store)
+            self.assertTablesEqual(stored, table)
+            self.assertEqual(summary.to_dict(), expected.to_dict())
+
+    def test_changed_file_is_parsed_again(self):
+        load_table(self.file_path)
+        with open(self.file_path, 'a', encoding='utf-8') as csv_file:
+            csv_file.write("1,2.5,3\n")
+        table, summaries, from_store = load_table(self.file_path)
+        self.assertFalse(from_store)
+        self.assertTablesEqual(table, read_csv_table(self.file_path))
+
+    def test_open_binary_matches_parsed_file(self):
+        load_table(self.file_path)
+        table, summaries = open_binary(store_paths(self.file_path)[0])
+        expected = read_csv_table(self.file_path)
+        self.assertTablesEqual(table, expected)
+        self.assertEqual([summary.to_dict() for summary in summaries],
+                         [summarise(expected.values(index)).to_dict() for index in range(len(expected.columns))])
+
+
+if __name__ == "__main__":
+    unittest.main()